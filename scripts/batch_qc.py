@@ -0,0 +1,226 @@
+"""
+This script parses the structured sample and carton identifiers in the HPAI
+detection results and aggregates quality-control metrics for each plate or
+batch, so that batch-to-batch drift can be reviewed alongside the state tally.
+
+Usage:
+    python -m scripts batch_qc <input_file> [-d <days_previous>] [-m <markdown_file>] <output_file>
+
+Arguments:
+    <input_file>: Path to the input TSV file containing detection results.
+    <days_previous>: Integer number of days before today over which to report the results
+    <markdown_file>: Optional path where a markdown section of the report will be saved.
+    <output_file>: Path where the output TSV file will be saved.
+
+Sample identifiers:
+    Sample IDs are expected to follow the pattern `<contributor>_<batch>_<well>`,
+    e.g. `dholab_30081_05`, and carton IDs to end in a sequential number, e.g.
+    `dholab_carton_0005`. Both are parsed with regular expressions inside the
+    polars query, so no per-row Python is run. Rows whose sample ID does not
+    follow the pattern are left out of the report.
+
+Output:
+    The script will generate a TSV file with one row per contributor and batch
+    and the following columns:
+    - Contributor: Contributor prefix parsed from the sample ID
+    - Batch: Batch or plate number parsed from the sample ID
+    - Samples: Number of samples (wells) in the batch
+    - Positive Samples: Number of samples that tested positive for HPAI
+    - Positivity: Fraction of samples that tested positive for HPAI
+    - First Carton / Last Carton: Range of sequential carton numbers in the batch
+    - Carton Gaps: Number of carton numbers missing from that range
+    - Mean Ct, Median Ct, Ct SD, Min Ct, Max Ct: Distribution of `average_cycle_threshold`
+    - Earliest Purchase / Latest Purchase: Range of `date_purchased`
+    - Purchase Spread (days) / Expiration Spread (days): Spread of purchase and expiration dates
+    - Outlier Wells: Wells whose Ct falls outside Tukey's fences for the batch
+
+Required libraries:
+    - polars
+
+Example:
+    python -m scripts batch_qc -m assets/batch_qc.md DETECTION_RESULTS.tsv assets/batch_qc.tsv
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Optional
+
+import polars as pl
+
+from .positivity_tally import apply_date_cutoff, parse_input_results
+from .tsv_to_md import md_table
+
+SAMPLE_ID_PATTERN = r"^(?P<contributor>.+)_(?P<batch>\d+)_(?P<well>\d+)$"
+CARTON_NUMBER_PATTERN = r"(\d+)$"
+OUTLIER_IQR_MULTIPLIER = 1.5
+
+
+def parse_sample_identifiers(detections: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Parse structured sample and carton identifiers into their own columns.
+
+    This function extracts the contributor, batch, and well from each sample ID
+    and the sequential number from each carton ID with vectorized regular
+    expressions, and casts the cycle threshold and expiration date columns to
+    their proper types. Rows whose sample ID cannot be parsed are dropped.
+
+    Args:
+        detections (pl.LazyFrame): A LazyFrame containing the detection results.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with `contributor`, `batch`, `well`,
+        `carton_number`, `cycle_threshold`, and `date_expiration` columns.
+    """
+    return (
+        detections.with_columns(
+            pl.col("sample").str.extract_groups(SAMPLE_ID_PATTERN).alias("sample_id"),
+            pl.col("carton")
+            .str.extract(CARTON_NUMBER_PATTERN)
+            .cast(pl.Int64, strict=False)
+            .alias("carton_number"),
+            pl.col("average_cycle_threshold")
+            .cast(pl.Float64, strict=False)
+            .alias("cycle_threshold"),
+            pl.col("date_expiration").str.to_date(strict=False).alias("date_expiration"),
+        )
+        .unnest("sample_id")
+        .filter(pl.col("batch").is_not_null())
+        .with_columns(
+            pl.col("batch").cast(pl.Int64),
+            pl.col("well").cast(pl.Int64),
+        )
+    )
+
+
+def flag_outlier_wells(detections: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Flag wells whose cycle threshold is an outlier within their batch.
+
+    A well is flagged when its Ct falls outside Tukey's fences, i.e. more than
+    `OUTLIER_IQR_MULTIPLIER` interquartile ranges below the first or above the
+    third quartile of the Ct values in the same batch. Wells without a Ct are
+    never flagged.
+
+    Args:
+        detections (pl.LazyFrame): A LazyFrame with parsed sample identifiers.
+
+    Returns:
+        pl.LazyFrame: The input LazyFrame with a boolean `outlier_well` column.
+    """
+    batch = ["contributor", "batch"]
+    ct = pl.col("cycle_threshold")
+    q1 = ct.quantile(0.25).over(batch)
+    q3 = ct.quantile(0.75).over(batch)
+    fence = (q3 - q1) * OUTLIER_IQR_MULTIPLIER
+    return detections.with_columns(
+        ((ct < q1 - fence) | (ct > q3 + fence)).fill_null(False).alias("outlier_well")  # noqa: FBT003
+    )
+
+
+def summarize_batches(detections: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Aggregate quality-control metrics for each contributor and batch.
+
+    Args:
+        detections (pl.LazyFrame): A LazyFrame with parsed sample identifiers
+        and flagged outlier wells.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with one row of QC metrics per batch.
+    """
+    ct = pl.col("cycle_threshold")
+    cartons = pl.col("carton_number")
+    return (
+        detections.group_by("contributor", "batch")
+        .agg(
+            pl.len().alias("Samples"),
+            pl.col("positive_for_HPAI").sum().alias("Positive Samples"),
+            pl.col("positive_for_HPAI").mean().round(3).alias("Positivity"),
+            cartons.min().alias("First Carton"),
+            cartons.max().alias("Last Carton"),
+            (cartons.max() - cartons.min() + 1 - cartons.n_unique()).alias("Carton Gaps"),
+            ct.mean().round(2).alias("Mean Ct"),
+            ct.median().round(2).alias("Median Ct"),
+            ct.std().round(2).alias("Ct SD"),
+            ct.min().alias("Min Ct"),
+            ct.max().alias("Max Ct"),
+            pl.col("date_purchased").min().alias("Earliest Purchase"),
+            pl.col("date_purchased").max().alias("Latest Purchase"),
+            (pl.col("date_purchased").max() - pl.col("date_purchased").min())
+            .dt.total_days()
+            .alias("Purchase Spread (days)"),
+            (pl.col("date_expiration").max() - pl.col("date_expiration").min())
+            .dt.total_days()
+            .alias("Expiration Spread (days)"),
+            # left missing rather than an empty string when there are none,
+            # like the other metrics a batch has no data for
+            pl.when(pl.col("outlier_well").any())
+            .then(
+                pl.col("well")
+                .filter(pl.col("outlier_well"))
+                .sort()
+                .cast(pl.String)
+                .str.join(", ")
+            )
+            .alias("Outlier Wells"),
+        )
+        .rename({"contributor": "Contributor", "batch": "Batch"})
+        .sort("Contributor", "Batch")
+    )
+
+
+def format_markdown_section(batch_qc: pl.DataFrame) -> str:
+    """
+    Render the batch QC table as a markdown section.
+
+    Args:
+        batch_qc (pl.DataFrame): The collected batch QC table.
+
+    Returns:
+        str: A markdown section with a heading and the batch QC table.
+    """
+    header = batch_qc.columns
+    rows = [
+        ["" if value is None else str(value) for value in row]
+        for row in batch_qc.iter_rows()
+    ]
+    return (
+        "## Batch QC\n\n"
+        "Positivity, Ct distribution, and date spread for each plate or batch\n\n"
+        f"{md_table([header, *rows])}\n"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    # pull input and output information from the command line
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--days_previous', default=None, type=int, required=False, help="Integer number of days before today over which to report the results")
+    parser.add_argument('-m', '--markdown', default=None, required=False, help="Optional path where a markdown section of the report will be saved.")
+    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
+    parser.add_argument('output_file', help="Path where the output TSV file will be saved.")
+
+    args = parser.parse_args(argv)
+
+    # parse the input detection results
+    detections = parse_input_results(args.input_file)
+
+    # apply date filter to the df if one is provided as input
+    if args.days_previous is not None:
+        detections = apply_date_cutoff(detections, args.days_previous)
+
+    # parse the structured identifiers and flag outlier wells within each batch
+    detections = flag_outlier_wells(parse_sample_identifiers(detections))
+
+    # aggregate everything per batch in a single pass over the table
+    batch_qc = summarize_batches(detections).collect()
+
+    # do the writing
+    batch_qc.write_csv(args.output_file, separator="\t")
+    if args.markdown is not None:
+        with open(args.markdown, "w", encoding="utf8") as markdown_handle:
+            markdown_handle.write(format_markdown_section(batch_qc))
+
@@ -0,0 +1,157 @@
+"""
+usage: python -m scripts [-h] [--time-startup] subcommand [args ...]
+
+A single command line entrypoint for every script in this directory. Each
+subcommand's module is only imported once that subcommand runs, and heavy
+dependencies like polars are registered as lazy modules that are only
+imported the first time they are actually used, so `--help` and the
+pure-text steps start without paying for them.
+
+Scripts that import their siblings, like `pipeline` or `batch_qc`, can only be
+run this way and have no file-level entrypoint of their own. The standalone
+ones, like `positivity_tally` and `tsv_to_md`, can still also be run directly
+as files.
+"""
+
+import time
+
+CLI_START = time.perf_counter()
+
+import argparse
+import importlib
+import importlib.util
+import sys
+import types
+from typing import Optional
+
+# subcommand name -> (module in this package, one-line description)
+SUBCOMMANDS = {
+    "normalize": ("normalize_table", "Validate and normalize a proposed detection results table."),
+    "positivity_tally": ("positivity_tally", "Tally tested, positive, and negative cartons per state."),
+    "tsv_to_md": ("tsv_to_md", "Convert TSV files into markdown tables."),
+    "splice_readme": ("splice_readme", "Splice the all-time tally table into the README."),
+    "splice_recent": ("splice_recent", "Splice the recent tally table into the README."),
+    "batch_qc": ("batch_qc", "Aggregate QC metrics per plate or batch."),
+    "quantify": ("quantify", "Fit standard curves and fill in copy numbers from Ct values."),
+    "verify_sra": ("verify_sra", "Verify SRA accessions and BioProjects."),
+    "consistency": ("consistency", "Check cross-field consistency rules."),
+    "pipeline": ("pipeline", "Bring pipeline stages up to date, skipping unchanged ones."),
+    "watch": ("watch", "Republish the tallies and README whenever the data changes."),
+    "startup_benchmark": ("startup_benchmark", "Benchmark how long each subcommand takes to start."),
+}
+
+# third-party modules that are only loaded once one of their attributes is used
+LAZY_MODULES = ("polars",)
+
+
+class LazyModule(types.ModuleType):
+    """
+    A placeholder for a module that imports the real module the first time
+    one of its attributes is looked up. Unlike `importlib.util.LazyLoader`, it
+    carries the real module's spec, so that `import name` statements elsewhere
+    do not trigger the import themselves.
+
+    The placeholder only swaps itself out of `sys.modules` on that first
+    lookup. Afterwards it mirrors the real module, and any attribute it is
+    missing is looked up on the real module, so that `hasattr` and
+    `getattr(module, name, default)` behave as they would there.
+    """
+
+    def __getattr__(self, attr: str) -> object:
+        loaded = self.__dict__.get("_lazy_loaded")
+        if loaded is None:
+            del sys.modules[self.__name__]
+            loaded = importlib.import_module(self.__name__)
+            self.__dict__.update(loaded.__dict__)
+            self.__dict__["_lazy_loaded"] = loaded
+        return getattr(loaded, attr)
+
+
+def lazy_import(name: str) -> None:
+    """
+    Register a placeholder in `sys.modules` that only imports the module the
+    first time it is used, so that `import name` is nearly free.
+    """
+    if name in sys.modules:
+        return
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return
+    module = LazyModule(name)
+    module.__spec__ = spec
+    sys.modules[name] = module
+
+
+def is_loaded(name: str) -> bool:
+    """
+    Check whether a module has actually been imported, as opposed to only
+    registered lazily.
+    """
+    module = sys.modules.get(name)
+    if isinstance(module, LazyModule):
+        return "_lazy_loaded" in module.__dict__
+    return module is not None
+
+
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parse the subcommand, leaving its arguments for the subcommand itself
+    """
+    subcommand_help = "\n".join(
+        f"  {name:<20}{description}" for name, (_, description) in SUBCOMMANDS.items()
+    )
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts",
+        description="Run one of the dairy HPAI monitoring scripts.",
+        epilog=f"subcommands:\n{subcommand_help}",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--time-startup",
+        action="store_true",
+        help="Report how long startup, importing the subcommand, and running it took.",
+    )
+    parser.add_argument(
+        "subcommand",
+        choices=SUBCOMMANDS,
+        metavar="subcommand",
+        help="The script to run; see the list below.",
+    )
+    parser.add_argument(
+        "args",
+        nargs=argparse.REMAINDER,
+        help="Arguments for the subcommand; pass `--help` after it for details.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    args = parse_command_line_args(argv)
+    module_name, _ = SUBCOMMANDS[args.subcommand]
+
+    for name in LAZY_MODULES:
+        lazy_import(name)
+
+    import_start = time.perf_counter()
+    module = importlib.import_module(f".{module_name}", __package__)
+    run_start = time.perf_counter()
+
+    # name the subcommand in each script's usage and help messages
+    sys.argv[0] = f"python -m scripts {args.subcommand}"
+    try:
+        module.main(args.args)
+    finally:
+        if args.time_startup:
+            run_end = time.perf_counter()
+            loaded = ", ".join(f"{name}={is_loaded(name)}" for name in LAZY_MODULES)
+            print(
+                f"startup {(import_start - CLI_START) * 1000:.1f} ms, "
+                f"import {module_name} {(run_start - import_start) * 1000:.1f} ms, "
+                f"run {(run_end - run_start) * 1000:.1f} ms "
+                f"(loaded: {loaded})",
+                file=sys.stderr,
+            )
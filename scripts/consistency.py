@@ -0,0 +1,198 @@
+"""
+The library `consistency` checks cross-field and cross-row invariants that
+column-level validation with `still.schema` cannot catch, such as a negative
+sample reporting a Ct value or one carton appearing in two states.
+
+Rules are declared in a TSV (by default `assets/consistency_rules.tsv`) with
+the columns `rule_id`, `severity` (`error` or `warning`), `kind`, `expression`,
+and `description`. Two kinds of rule are supported:
+
+- `row`: `expression` is a SQL predicate that is true for rows violating the
+  rule, e.g. `date_expiration < date_purchased`.
+- `consistent`: `expression` has the form `key -> value` and is violated by
+  every row whose `value` differs from another row with the same `key`, e.g.
+  `carton -> processing_plant_state`. Missing values neither conflict with
+  nor are reported alongside the others.
+
+Every rule is compiled into a single lazy polars query, so the table is only
+scanned once no matter how many rules there are. It can be called in a Python
+module like so:
+
+```python3
+from .consistency import check_consistency
+```
+
+or run on its own:
+
+    python -m scripts consistency [-r RULES] <input_file>
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+
+RULE_KINDS = ("row", "consistent")
+SEVERITIES = ("error", "warning")
+
+
+def read_rules(rules_path: Path) -> list[dict[str, str]]:
+    """
+    Read and sanity-check the declarative rules file.
+
+    Args:
+        rules_path (Path): Path to a TSV of rules.
+
+    Returns:
+        list[dict[str, str]]: One dictionary per rule, keyed by column name.
+    """
+    with open(rules_path, encoding="utf8") as rules_handle:
+        rules = list(csv.DictReader(rules_handle, delimiter="\t"))
+    for rule in rules:
+        assert (
+            rule["kind"] in RULE_KINDS
+        ), f"Rule {rule['rule_id']} has unknown kind '{rule['kind']}'."
+        assert (
+            rule["severity"] in SEVERITIES
+        ), f"Rule {rule['rule_id']} has unknown severity '{rule['severity']}'."
+    rule_ids = [rule["rule_id"] for rule in rules]
+    assert len(rule_ids) == len(set(rule_ids)), "Rule IDs must be unique."
+    return rules
+
+
+def type_columns(input_table: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Cast the columns that rules compare to their proper types, treating `NA`
+    and empty cells as missing.
+
+    Args:
+        input_table (pl.LazyFrame): The input table, with or without inferred types.
+
+    Returns:
+        pl.LazyFrame: The table with numeric, date, and boolean columns typed
+        and every other column as a string.
+    """
+    names = input_table.collect_schema().names()
+    numeric_columns = [
+        "average_cycle_threshold",
+        "isolate_average_copies_per_uL",
+        "dairyproduct_average_copies_per_mL",
+    ]
+    date_columns = [name for name in names if name.startswith("date_")]
+    return input_table.select(
+        pl.all().cast(pl.String).replace(["", "NA"], None)
+    ).with_columns(
+        pl.col(numeric_columns).cast(pl.Float64, strict=False),
+        pl.col(date_columns).str.to_date(strict=False),
+        pl.col("positive_for_HPAI").str.to_uppercase().eq("TRUE"),
+    )
+
+
+def compile_rule(rule: dict[str, str]) -> pl.Expr:
+    """
+    Compile a single rule into a boolean expression that is true for every
+    row violating it.
+
+    Args:
+        rule (dict[str, str]): A rule as read by `read_rules`.
+
+    Returns:
+        pl.Expr: A boolean expression named after the rule ID.
+    """
+    if rule["kind"] == "row":
+        violated = pl.sql_expr(rule["expression"])
+    else:
+        key, value = (column.strip() for column in rule["expression"].split("->"))
+        violated = (
+            pl.col(key).is_not_null()
+            & pl.col(value).is_not_null()
+            & (pl.col(value).drop_nulls().n_unique().over(key) > 1)
+        )
+    return violated.fill_null(False).alias(rule["rule_id"])  # noqa: FBT003
+
+
+def find_violations(
+    input_table: pl.LazyFrame,
+    rules: list[dict[str, str]],
+) -> pl.DataFrame:
+    """
+    Evaluate every rule against the input table in one pass.
+
+    Args:
+        input_table (pl.LazyFrame): The input table, e.g. from `pl.scan_csv`.
+        rules (list[dict[str, str]]): Rules as read by `read_rules`.
+
+    Returns:
+        pl.DataFrame: One row per violation, with the line of the input file,
+        sample, rule ID, severity, and description.
+    """
+    rule_ids = [rule["rule_id"] for rule in rules]
+    rule_info = pl.LazyFrame(
+        {
+            "rule_id": rule_ids,
+            "severity": [rule["severity"] for rule in rules],
+            "description": [rule["description"] for rule in rules],
+        }
+    )
+    return (
+        # lines are counted from 2 to account for the header
+        type_columns(input_table)
+        .with_row_index("line", offset=2)
+        .select("line", "sample", *(compile_rule(rule) for rule in rules))
+        .unpivot(index=["line", "sample"], on=rule_ids, variable_name="rule_id")
+        .filter(pl.col("value"))
+        .join(rule_info, on="rule_id", how="left")
+        .select("line", "sample", "rule_id", "severity", "description")
+        .sort("line", "rule_id")
+        .collect()
+    )
+
+
+async def check_consistency(input_table: pl.LazyFrame, rules_path: Path) -> None:
+    """
+    Check the input table against the declarative consistency rules.
+
+    Args:
+        input_table (pl.LazyFrame): The input table, e.g. from `pl.scan_csv`.
+        rules_path (Path): Path to a TSV of rules.
+
+    Every violation is printed with its rule ID and severity. If any rule
+    with `error` severity is violated, the function exits with a non-zero
+    status code; violations of `warning` rules are reported but let the
+    table through.
+    """
+    assert os.path.isfile(rules_path), f"The rules file {rules_path} does not exist."
+
+    violations = find_violations(input_table, read_rules(rules_path))
+    if violations.height == 0:
+        print("All consistency rules passed.")
+        return
+
+    with pl.Config(tbl_rows=-1, tbl_width_chars=200, fmt_str_lengths=80):
+        print(f"The following consistency rules were violated:\n{violations}")
+
+    if violations.filter(pl.col("severity") == "error").height > 0:
+        sys.exit(1)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--rules', type=Path, default=Path("assets/consistency_rules.tsv"), help="TSV of consistency rules to check.")
+    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
+
+    args = parser.parse_args(argv)
+
+    input_table = pl.scan_csv(args.input_file, separator="\t", infer_schema_length=0)
+
+    asyncio.run(check_consistency(input_table, args.rules))
+
@@ -1,5 +1,3 @@
-#!/usr/bin/env python3
-
 """
 The library `normalize` contains a set of functions that can be called to
 normalize a proposed milk HPAI detection update prior to merging with the main branch.
@@ -10,6 +8,8 @@ from .normalize import remove_duplicate_rows, validate_asset_files
 ```
 """
 
+from __future__ import annotations
+
 import os
 import sys
 
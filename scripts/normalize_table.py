@@ -0,0 +1,105 @@
+"""
+Coordinate data flow through our library of normalization functions to ensure
+the integrity of the data at https://github.com/dholab/dairy-hpai-monitoring
+
+Usage:
+    python -m scripts normalize --input_table <input_table> [--assets_dir <assets_dir>] [--rules <rules>]
+"""
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+
+from .consistency import check_consistency
+from .normalize import remove_duplicate_rows, validate_asset_files
+
+
+GIT_MILK_BANNER = r"""
+                ___                              ___   ___                        
+          .-.  (   )                       .-.  (   ) (   )           .---.       
+  .--.   ( __)  | |_        ___ .-. .-.   ( __)  | |   | |   ___     /  _   \    
+ /    \  (''") (   __)     (   )   '   \  (''")  | |   | |  (   )   | |   `. .    
+;  ,-. '  | |   | |         |  .-.  .-. ;  | |   | |   | |  ' /    (___)   | |    
+| |  | |  | |   | | ___     | |  | |  | |  | |   | |   | |,' /          .-'_/     
+| |  | |  | |   | |(   )    | |  | |  | |  | |   | |   | .  '.          | |       
+| |  | |  | |   | | | |     | |  | |  | |  | |   | |   | | `. \         |_|       
+| '  | |  | |   | ' | |     | |  | |  | |  | |   | |   | |   \ \                  
+'  `-' |  | |   ' `-' ;     | |  | |  | |  | |   | |   | |    \ .       .-.       
+ `.__. | (___)   `.__.     (___)(___)(___)(___) (___) (___ ) (___)     (   )      
+ ( `-' ;                                                                `-'       
+  `.__.                                                                           
+"""
+
+
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_table",
+        "-i",
+        type=Path,
+        required=True,
+        help="Proposed table to be normalized before submission and release.",
+    )
+    parser.add_argument(
+        "--assets_dir",
+        "-a",
+        type=Path,
+        required=False,
+        default="assets",
+        help="Directory to store repository assets.",
+    )
+    parser.add_argument(
+        "--rules",
+        "-r",
+        type=Path,
+        required=False,
+        default=None,
+        help="Consistency rules to check the table against. Defaults to `consistency_rules.tsv` in the assets directory.",
+    )
+
+    args = parser.parse_args(argv)
+    return args
+
+
+async def coordinate(args: argparse.Namespace) -> None:
+    """
+    Coordinate the flow of proposed data through our normalization
+    functions defined in the library `normalize.py`.
+    """
+
+    # make sure the input table path points to a file that exists
+    assert os.path.isfile(
+        args.input_table
+    ), f"The provided file {args.input_table} does not exist."
+
+    # scan in the TSV
+    table_df = pl.scan_csv(args.input_table, separator="\t")
+
+    # make sure all asset files are present
+    await validate_asset_files(table_df, args.assets_dir)
+
+    # check cross-field and cross-row consistency, failing on errors and
+    # warning about anything else
+    rules_path = args.rules or Path(args.assets_dir) / "consistency_rules.tsv"
+    await check_consistency(table_df, rules_path)
+
+    # remove duplicate rows while any validation finishes
+    normalized_df = await remove_duplicate_rows(table_df)
+
+    # write out the final CSV
+    normalized_df.sink_csv("normalized_table.tsv", separator="\t")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    args = parse_command_line_args(argv)
+    print(GIT_MILK_BANNER)
+    asyncio.run(coordinate(args))
+
@@ -0,0 +1,471 @@
+"""
+usage: python -m scripts pipeline [-h] [-d DAYS_PREVIOUS] [-c CACHE_DIR] [-f] [target ...]
+
+A make-like runner for the subcommands of `python -m scripts`. Each stage is
+keyed by a content hash of everything it depends on (input files, asset files,
+parameters such as `--days_previous`, and the source of the script itself).
+Outputs are stored content-addressed in a local cache, so a stage whose key has
+been seen before is skipped and its cached outputs are published instead.
+
+Every stage runs in its own scratch directory, which means scripts that write
+fixed filenames like `normalized_table.tsv` or `new_readme.md` can safely run
+side by side. Outputs are published atomically while holding a lock on the
+cache, and only once the stage's key has been recomputed under that lock: if
+another runner changed one of the stage's inputs in the meantime, such as the
+README that two splicing stages both rewrite, the stage is run again on the
+new inputs rather than publishing stale outputs over the other runner's work.
+
+positional arguments:
+  target                Stages to bring up to date, along with the stages they
+                        depend on. Defaults to every stage except `normalize`
+                        and `quantify`.
+
+options:
+  -h, --help            show this help message and exit
+  -d DAYS_PREVIOUS, --days_previous DAYS_PREVIOUS
+                        Number of days before today covered by the recent tally.
+  -c CACHE_DIR, --cache_dir CACHE_DIR
+                        Directory where stage manifests and outputs are cached.
+  -f, --force           Rerun the selected stages even if they are cached.
+"""
+
+import argparse
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from .cli import SUBCOMMANDS
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+DEFAULT_CACHE_DIR = Path(".pipeline_cache")
+DEFAULT_DAYS_PREVIOUS = 90
+# stages that only run when asked for by name: normalize rewrites the table
+# itself, and quantify writes a full copy of it that nothing else reads
+OPT_IN_STAGES = ("normalize", "quantify")
+ASSET_FILE_COLUMNS = ("primer_asset_file", "probe_asset_file")
+
+
+class Stage(NamedTuple):
+    """
+    A single step of the pipeline, running one subcommand of `python -m scripts`.
+
+    `args` may refer to input paths with `{input}` placeholders formatted from
+    `inputs` and `paths`, which are resolved to absolute paths before the
+    script runs. Everything in `inputs` is hashed into the stage's key, while
+    `paths` are only passed to the script; what it reads from them is keyed by
+    the files `discover` returns instead. `outputs` maps files the script
+    writes into its scratch directory onto the paths they are published to,
+    and `stdout`, if set, is where the script's standard output is published.
+    """
+
+    name: str
+    command: str
+    args: tuple[str, ...]
+    inputs: dict[str, Path]
+    outputs: dict[str, Path]
+    stdout: Optional[Path] = None
+    sources: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    deps: tuple[str, ...] = ()
+    paths: Optional[dict[str, Path]] = None
+    discover: Optional[Callable[[], dict[str, Path]]] = None
+
+
+def named_asset_files(data: Path, assets_dir: Path) -> dict[str, Path]:
+    """
+    Find the primer and probe files a detection results table names, the way
+    `normalize.validate_asset_files` does, so that the stage checking them is
+    keyed on those files rather than on everything in the assets directory.
+    """
+    if not data.is_file():
+        return {}
+    with open(data, newline="", encoding="utf8") as data_handle:
+        names = {
+            row[column]
+            for row in csv.DictReader(data_handle, delimiter="\t")
+            for column in ASSET_FILE_COLUMNS
+            if row.get(column) and row[column] != "REDACTED"
+        }
+    return {f"asset:{name}": assets_dir / name for name in names}
+
+
+def define_stages(days_previous: int) -> list[Stage]:
+    """
+    Define every stage of the pipeline in the order they should run, mirroring
+    the steps in our GitHub workflows.
+    """
+    today = date.today().isoformat()
+    return [
+        Stage(
+            name="normalize",
+            command="normalize",
+            args=("--input_table", "{data}", "--assets_dir", "{assets}"),
+            inputs={
+                "data": Path("DETECTION_RESULTS.tsv"),
+                "rules": Path("assets/consistency_rules.tsv"),
+            },
+            outputs={"normalized_table.tsv": Path("DETECTION_RESULTS.tsv")},
+            sources=("normalize.py", "consistency.py"),
+            # only the primer and probe files the table names are checked, so
+            # tallies published into assets/ do not invalidate this stage
+            paths={"assets": Path("assets")},
+            discover=lambda: named_asset_files(Path("DETECTION_RESULTS.tsv"), Path("assets")),
+        ),
+        Stage(
+            name="tally",
+            command="positivity_tally",
+            args=("{data}", "positivity_tally.tsv"),
+            inputs={"data": Path("DETECTION_RESULTS.tsv")},
+            outputs={"positivity_tally.tsv": Path("assets/positivity_tally.tsv")},
+        ),
+        Stage(
+            name="recent_tally",
+            command="positivity_tally",
+            args=("{data}", "-d", str(days_previous), "recent_tally.tsv"),
+            inputs={"data": Path("DETECTION_RESULTS.tsv")},
+            outputs={"recent_tally.tsv": Path("assets/recent_tally.tsv")},
+            # the date cutoff is relative to today
+            params=(today,),
+        ),
+        Stage(
+            name="batch_qc",
+            command="batch_qc",
+            args=("{data}", "-m", "batch_qc.md", "batch_qc.tsv"),
+            inputs={"data": Path("DETECTION_RESULTS.tsv")},
+            outputs={
+                "batch_qc.tsv": Path("assets/batch_qc.tsv"),
+                "batch_qc.md": Path("assets/batch_qc.md"),
+            },
+            sources=("positivity_tally.py", "tsv_to_md.py"),
+        ),
+        Stage(
+            name="quantify",
+            command="quantify",
+            args=("{data}", "-c", "standard_curves.tsv", "quantified_results.tsv"),
+            inputs={"data": Path("DETECTION_RESULTS.tsv")},
+            outputs={
+                "standard_curves.tsv": Path("assets/standard_curves.tsv"),
+                "quantified_results.tsv": Path("assets/quantified_results.tsv"),
+            },
+        ),
+        Stage(
+            name="tally_md",
+            command="tsv_to_md",
+            args=("{tally}",),
+            inputs={"tally": Path("assets/positivity_tally.tsv")},
+            outputs={},
+            stdout=Path("assets/positivity_tally.md"),
+            deps=("tally",),
+        ),
+        Stage(
+            name="recent_tally_md",
+            command="tsv_to_md",
+            args=("{tally}",),
+            inputs={"tally": Path("assets/recent_tally.tsv")},
+            outputs={},
+            stdout=Path("assets/recent_tally.md"),
+            deps=("recent_tally",),
+        ),
+        Stage(
+            name="splice_recent",
+            command="splice_recent",
+            args=("--readme", "{readme}", "--tally_file", "{tally}"),
+            inputs={"readme": Path("README.md"), "tally": Path("assets/recent_tally.md")},
+            outputs={"new_readme.md": Path("README.md")},
+            # the spliced heading is stamped with today's date
+            params=(today,),
+            deps=("recent_tally_md",),
+        ),
+        Stage(
+            name="readme",
+            command="splice_readme",
+            args=("--readme", "{readme}", "--tally_file", "{tally}"),
+            inputs={"readme": Path("README.md"), "tally": Path("assets/positivity_tally.md")},
+            outputs={"new_readme.md": Path("README.md")},
+            deps=("tally_md",),
+        ),
+    ]
+
+
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parse the targets and a few named arguments from the command line
+    """
+    parser = argparse.ArgumentParser(
+        description="Bring pipeline stages up to date, skipping any whose inputs are unchanged.",
+    )
+    parser.add_argument(
+        "targets",
+        metavar="target",
+        nargs="*",
+        help="Stages to bring up to date, along with the stages they depend on. "
+        "Defaults to every stage except `normalize` and `quantify`.",
+    )
+    parser.add_argument(
+        "-d",
+        "--days_previous",
+        type=int,
+        default=DEFAULT_DAYS_PREVIOUS,
+        required=False,
+        help="Number of days before today covered by the recent tally.",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache_dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        required=False,
+        help="Directory where stage manifests and outputs are cached.",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Rerun the selected stages even if they are cached.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def hash_path(path: Path) -> str:
+    """
+    Hash the contents of a file, or of every file under a directory along with
+    their relative paths. Missing paths hash to a fixed sentinel so that a stage
+    depending on them is still keyed deterministically.
+    """
+    digest = hashlib.sha256()
+    if path.is_dir():
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            digest.update(str(child.relative_to(path)).encode())
+            digest.update(hash_path(child).encode())
+    elif path.is_file():
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def stage_key(stage: Stage) -> str:
+    """
+    Compute the content hash that identifies one run of a stage.
+    """
+    digest = hashlib.sha256()
+    digest.update(stage.name.encode())
+    script = f"{SUBCOMMANDS[stage.command][0]}.py"
+    for source in (script, *stage.sources):
+        digest.update(hash_path(SCRIPTS_DIR / source).encode())
+    inputs = dict(stage.inputs)
+    if stage.discover is not None:
+        inputs.update(stage.discover())
+    for name, path in sorted(inputs.items()):
+        digest.update(f"{name}={hash_path(path)}".encode())
+    digest.update("\0".join((*stage.args, *stage.params)).encode())
+    return digest.hexdigest()
+
+
+def default_file_mode() -> int:
+    """
+    The mode a newly created file would get under the current umask.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """
+    Write bytes to a path by way of a temporary file in the same directory, so
+    that readers never see a partially written file. The temporary file is
+    created private, so it is given the mode of the file it replaces, or the
+    usual mode for a new file, before it is moved into place.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        mode = default_file_mode()
+    handle, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(handle, "wb") as tmp:
+            tmp.write(data)
+            os.fchmod(tmp.fileno(), mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+@contextmanager
+def cache_lock(cache_dir: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on the cache while outputs are being published.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / "lock", "w") as lock_handle:
+        fcntl.flock(lock_handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+
+def store_object(cache_dir: Path, data: bytes) -> str:
+    """
+    Store bytes in the content-addressed object store and return their hash.
+    """
+    object_hash = hashlib.sha256(data).hexdigest()
+    object_path = cache_dir / "objects" / object_hash[:2] / object_hash
+    if not object_path.exists():
+        atomic_write(object_path, data)
+    return object_hash
+
+
+def load_manifest(cache_dir: Path, key: str) -> Optional[dict[str, str]]:
+    """
+    Load the outputs recorded for a stage key, as long as every object they
+    refer to is still in the cache.
+    """
+    manifest_path = cache_dir / "stages" / f"{key}.json"
+    if not manifest_path.is_file():
+        return None
+    with open(manifest_path, encoding="utf8") as manifest_handle:
+        manifest = json.load(manifest_handle)
+    for object_hash in manifest.values():
+        if not (cache_dir / "objects" / object_hash[:2] / object_hash).is_file():
+            return None
+    return manifest
+
+
+def publish(cache_dir: Path, manifest: dict[str, str]) -> None:
+    """
+    Copy cached objects onto their destination paths, leaving any destination
+    that already holds the right content untouched.
+    """
+    for destination, object_hash in manifest.items():
+        destination_path = Path(destination)
+        if hash_path(destination_path) == object_hash:
+            continue
+        object_path = cache_dir / "objects" / object_hash[:2] / object_hash
+        atomic_write(destination_path, object_path.read_bytes())
+
+
+def run_stage(stage: Stage, cache_dir: Path) -> dict[str, str]:
+    """
+    Run a stage's subcommand in a scratch directory and store its outputs in
+    the cache, returning a manifest of where each output should be published.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    resolved = {
+        name: str(path.resolve())
+        for name, path in {**stage.inputs, **(stage.paths or {})}.items()
+    }
+    args = [arg.format(**resolved) for arg in stage.args]
+    scratch = Path(tempfile.mkdtemp(dir=cache_dir, prefix=f"{stage.name}."))
+    # make the `scripts` package importable from inside the scratch directory
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "scripts", stage.command, *args],
+            cwd=scratch,
+            env=env,
+            stdout=subprocess.PIPE if stage.stdout is not None else None,
+            check=True,
+        )
+        manifest = {}
+        for produced, destination in stage.outputs.items():
+            data = (scratch / produced).read_bytes()
+            manifest[str(destination)] = store_object(cache_dir, data)
+        if stage.stdout is not None:
+            manifest[str(stage.stdout)] = store_object(cache_dir, result.stdout)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return manifest
+
+
+def select_stages(stages: list[Stage], targets: list[str]) -> list[Stage]:
+    """
+    Select the requested stages and everything they depend on, keeping the
+    order in which the stages were defined.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [target for target in targets if target not in by_name]
+    assert not unknown, f"Unknown pipeline stage(s): {', '.join(unknown)}"
+
+    if not targets:
+        targets = [stage.name for stage in stages if stage.name not in OPT_IN_STAGES]
+
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in selected]
+
+
+def bring_up_to_date(stage: Stage, cache_dir: Path, force: bool = False) -> tuple[str, int]:
+    """
+    Publish a stage's outputs, from the cache if its key has been seen before
+    and by running it otherwise. Returns whether the stage was `cached` or
+    `ran`, and how many times its inputs changed while it was running.
+    """
+    reruns = 0
+    while True:
+        key = stage_key(stage)
+        manifest = None if force else load_manifest(cache_dir, key)
+        status = "cached"
+        if manifest is None:
+            manifest = run_stage(stage, cache_dir)
+            status = "ran"
+
+        # publish outputs and record the manifest while holding the lock, so
+        # concurrent runners never interleave their writes. The stage ran
+        # without the lock, so if another runner has since changed one of
+        # its inputs, go around again instead of publishing stale outputs.
+        with cache_lock(cache_dir):
+            if stage_key(stage) == key:
+                publish(cache_dir, manifest)
+                if status == "ran":
+                    atomic_write(
+                        cache_dir / "stages" / f"{key}.json",
+                        json.dumps(manifest, indent=2).encode(),
+                    )
+                return status, reruns
+        reruns += 1
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    args = parse_command_line_args(argv)
+    stages = select_stages(define_stages(args.days_previous), args.targets)
+
+    for stage in stages:
+        start = time.perf_counter()
+        try:
+            status, reruns = bring_up_to_date(stage, args.cache_dir, args.force)
+        except subprocess.CalledProcessError as error:
+            print(f"{stage.name}: failed with exit status {error.returncode}", file=sys.stderr)
+            sys.exit(error.returncode)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        retried = f", inputs changed {reruns} time(s) while running" if reruns else ""
+        print(f"{stage.name}: {status} ({elapsed:.1f} ms{retried})", file=sys.stderr)
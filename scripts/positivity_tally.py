@@ -5,7 +5,7 @@ This script processes detection results for HPAI (Highly Pathogenic Avian Influe
 and generates a summary report.
 
 Usage:
-    python positivity_tally.py <input_file> -d <days_previous> <output_file>
+    python -m scripts positivity_tally <input_file> -d <days_previous> <output_file>
 
 Arguments:
     <input_file>: Path to the input TSV file containing detection results.
@@ -31,17 +31,20 @@ Required libraries:
     - polars
 
 Example:
-    python positivity_tally.py --days_previous 60 input_data.tsv output_summary.tsv
+    python -m scripts positivity_tally --days_previous 60 input_data.tsv output_summary.tsv
 """
 
+from __future__ import annotations
+
 import sys
 from datetime import datetime, timedelta
 import argparse
+from typing import IO, Optional, Union
 
 import polars as pl
 
 
-def parse_input_results(detection_results: str) -> pl.LazyFrame:
+def parse_input_results(detection_results: Union[str, IO[bytes]]) -> pl.LazyFrame:
     """
     Parse input results from a TSV file and apply transformations.
 
@@ -50,7 +53,8 @@ def parse_input_results(detection_results: str) -> pl.LazyFrame:
     renames the processing_plant_state column.
 
     Args:
-        detection_results (str): Path to the input TSV file.
+        detection_results (Union[str, IO[bytes]]): Path to the input TSV file,
+        or a binary file object holding its contents.
 
     Returns:
         pl.LazyFrame: A LazyFrame with the parsed and transformed data.
@@ -202,25 +206,22 @@ def generate_final_results(
     )
 
 
-def main() -> None:
-    """
-    Script entrypoint
+def tally_detections(
+    detections: pl.LazyFrame,
+    days_previous: Optional[int] = None,
+) -> pl.LazyFrame:
     """
-    # pull input and output information from the command line
-    parser = argparse.ArgumentParser()
-    parser.add_argument('-d', '--days_previous', default=None, type=int, required=False, help="Integer number of days before today over which to report the results")
-    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
-    parser.add_argument('output_file', help="Path where the output TSV file will be saved.")
-
-    args = parser.parse_args()
+    Tally tested, positive, and negative cartons and the latest sampling date
+    for each processing plant state.
 
-    detection_results = args.input_file
-    days_previous = args.days_previous
-    output_path = args.output_file
-
-    # parse the input detection results
-    detections = parse_input_results(detection_results)
+    Args:
+        detections (pl.LazyFrame): A LazyFrame from `parse_input_results`.
+        days_previous (Optional[int]): If provided, only results purchased in
+        this many days before today are tallied.
 
+    Returns:
+        pl.LazyFrame: A LazyFrame with the final combined results.
+    """
     # apply date filter to the df if one is provided as input
     if days_previous is not None:
         detections = apply_date_cutoff(detections, days_previous)
@@ -242,13 +243,36 @@ def main() -> None:
 
     # use a series of left joins to generate the final results that will be written
     # out to a TSV
-    final_results = generate_final_results(
+    return generate_final_results(
         total_tested,
         positive_counts,
         negative_counts,
         latest_dates,
     )
 
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    # pull input and output information from the command line
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--days_previous', default=None, type=int, required=False, help="Integer number of days before today over which to report the results")
+    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
+    parser.add_argument('output_file', help="Path where the output TSV file will be saved.")
+
+    args = parser.parse_args(argv)
+
+    detection_results = args.input_file
+    days_previous = args.days_previous
+    output_path = args.output_file
+
+    # parse the input detection results
+    detections = parse_input_results(detection_results)
+
+    # tally cartons per state, restricted to recent results if requested
+    final_results = tally_detections(detections, days_previous)
+
     # do the writing
     final_results.collect().write_csv(output_path, separator="\t")
 
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+This script fits a qPCR standard curve for each assay in the HPAI detection
+results and uses it to fill in copy numbers for positive samples that only
+report a cycle threshold.
+
+Usage:
+    python -m scripts quantify <input_file> [-s <standards_file>] -c <curves_file> <output_file>
+
+Arguments:
+    <input_file>: Path to the input TSV file containing detection results.
+    <standards_file>: Optional TSV of standards to fit the curves from instead of the detection results.
+    <curves_file>: Path where the fitted standard curves will be saved.
+    <output_file>: Path where the quantified detection results will be saved.
+
+Standard curves:
+    A standard curve is fit for each combination of `assay`, `primer_asset_file`,
+    and `probe_asset_file` and for each of `isolate_average_copies_per_uL` and
+    `dairyproduct_average_copies_per_mL`, by least-squares regression of
+    `average_cycle_threshold` on log10 copies:
+
+        Ct = slope * log10(copies) + intercept
+
+    Every curve is fit at once from per-group moments inside a single polars query.
+    Curves are fit from rows that report both a Ct and a copy number, or from
+    the standards file if one is provided, which must have the same column
+    names as the detection results. Curves with fewer than
+    `MIN_STANDARD_POINTS` points are reported but not used.
+
+    No sample in the detection results reports
+    `dairyproduct_average_copies_per_mL`, and copies per mL of dairy product
+    cannot be worked out from copies per uL of isolate without the extraction
+    and elution volumes, which the table does not record. Without a standards
+    file only isolate curves are fit from the samples, so dairy product copy
+    numbers are only derived when `--standards` is given.
+
+Output:
+    The curves file has one row per assay and quantity with the number of
+    points, slope, intercept, amplification efficiency (10^(-1/slope) - 1), and
+    R². The output file is the input table with missing copy numbers filled in
+    for positive samples, along with `isolate_copies_derived` and
+    `dairyproduct_copies_derived` columns flagging the filled-in values. Every
+    other cell is written exactly as it was read, so `NA` stays `NA`.
+
+Required libraries:
+    - polars
+
+Example:
+    python -m scripts quantify -c assets/standard_curves.tsv DETECTION_RESULTS.tsv quantified_results.tsv
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Optional
+
+import polars as pl
+
+ASSAY_KEY = ["assay", "primer_asset_file", "probe_asset_file"]
+COPY_NUMBER_FLAGS = {
+    "isolate_average_copies_per_uL": "isolate_copies_derived",
+    "dairyproduct_average_copies_per_mL": "dairyproduct_copies_derived",
+}
+MIN_STANDARD_POINTS = 3
+
+# the only copy numbers the detection results report alongside a Ct, and so
+# the only curves that can be fit from the samples without a standards file
+SAMPLE_FIT_QUANTITIES = ["isolate_average_copies_per_uL"]
+
+
+def numeric(column: str) -> pl.Expr:
+    """
+    Read a text column as floats, treating `NA`, empty cells, and anything
+    else that is not a number as missing.
+    """
+    return pl.col(column).cast(pl.Float64, strict=False)
+
+
+def parse_quantification_inputs(detection_results: str) -> pl.LazyFrame:
+    """
+    Parse a TSV of detection results or standards with every column kept as
+    text, so that cells that are not modified are written back unchanged. The
+    Ct and copy number columns are read as numbers with `numeric` where needed.
+
+    Args:
+        detection_results (str): Path to the input TSV file.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with every column as a string.
+    """
+    return pl.scan_csv(detection_results, separator="\t", infer_schema_length=0)
+
+
+def fit_standard_curves(
+    standards: pl.LazyFrame,
+    quantities: Optional[list[str]] = None,
+) -> pl.LazyFrame:
+    """
+    Fit a standard curve for every assay and copy number column at once.
+
+    The least-squares slope and intercept of Ct on log10 copies are computed
+    from per-group covariance and means, so every curve comes out of one
+    vectorized aggregation rather than a fit per assay.
+
+    Args:
+        standards (pl.LazyFrame): A LazyFrame with Ct and copy number columns.
+        quantities (Optional[list[str]]): The copy number columns to fit curves
+        for. Defaults to all of them.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with one fitted curve per assay and quantity.
+    """
+    points = pl.concat(
+        [
+            standards.select(
+                *ASSAY_KEY,
+                pl.lit(quantity).alias("quantity"),
+                numeric(quantity).log10().alias("log_copies"),
+                numeric("average_cycle_threshold").alias("cycle_threshold"),
+            )
+            for quantity in (quantities or list(COPY_NUMBER_FLAGS))
+        ]
+    ).filter(
+        pl.col("cycle_threshold").is_not_null()
+        & pl.col("log_copies").is_not_null()
+        & pl.col("log_copies").is_finite()
+    )
+
+    x = pl.col("log_copies")
+    y = pl.col("cycle_threshold")
+    slope = pl.cov(x, y) / x.var()
+    return (
+        points.group_by(*ASSAY_KEY, "quantity")
+        .agg(
+            pl.len().alias("points"),
+            slope.alias("slope"),
+            (y.mean() - slope * x.mean()).alias("intercept"),
+            pl.corr(x, y).pow(2).alias("r_squared"),
+        )
+        .with_columns(
+            (pl.lit(10.0).pow(-1 / pl.col("slope")) - 1).alias("efficiency"),
+        )
+        .sort(*ASSAY_KEY, "quantity", nulls_last=True)
+    )
+
+
+def fill_copy_numbers(
+    detections: pl.LazyFrame,
+    curves: pl.LazyFrame,
+) -> pl.LazyFrame:
+    """
+    Fill in missing copy numbers for positive samples from their assay's
+    standard curve and flag which values were derived.
+
+    Args:
+        detections (pl.LazyFrame): A LazyFrame of parsed detection results.
+        curves (pl.LazyFrame): A LazyFrame of fitted standard curves.
+
+    Returns:
+        pl.LazyFrame: The detection results with copy numbers filled in and a
+        TRUE/FALSE flag column for each copy number column.
+    """
+    usable_curves = curves.filter(
+        (pl.col("points") >= MIN_STANDARD_POINTS) & pl.col("slope").is_finite()
+    )
+    ct = numeric("average_cycle_threshold")
+    for quantity, flag in COPY_NUMBER_FLAGS.items():
+        curve = usable_curves.filter(pl.col("quantity") == quantity).select(
+            *ASSAY_KEY, "slope", "intercept"
+        )
+        estimate = pl.lit(10.0).pow((ct - pl.col("intercept")) / pl.col("slope"))
+        derived = (
+            numeric(quantity).is_null()
+            & ct.is_not_null()
+            & pl.col("slope").is_not_null()
+            & pl.col("positive_for_HPAI").eq("TRUE")
+        )
+        detections = (
+            detections.join(curve, on=ASSAY_KEY, how="left")
+            .with_columns(
+                pl.when(derived)
+                .then(estimate.round(2).cast(pl.String))
+                .otherwise(pl.col(quantity))
+                .alias(quantity),
+                pl.when(derived).then(pl.lit("TRUE")).otherwise(pl.lit("FALSE")).alias(flag),
+            )
+            .drop("slope", "intercept")
+        )
+    return detections
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    # pull input and output information from the command line
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--standards', default=None, required=False, help="Optional TSV of standards to fit the curves from instead of the detection results.")
+    parser.add_argument('-c', '--curves_file', required=True, help="Path where the fitted standard curves will be saved.")
+    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
+    parser.add_argument('output_file', help="Path where the quantified detection results will be saved.")
+
+    args = parser.parse_args(argv)
+
+    # parse the input detection results
+    detections = parse_quantification_inputs(args.input_file)
+
+    # fit the curves from the supplied standards if there are any, otherwise
+    # from the samples that already report both a Ct and a copy number, which
+    # only ever report isolate copy numbers
+    if args.standards is not None:
+        standards = parse_quantification_inputs(args.standards)
+        quantities = list(COPY_NUMBER_FLAGS)
+    else:
+        standards = detections
+        quantities = SAMPLE_FIT_QUANTITIES
+
+    # fit every curve at once, then fill in missing copy numbers from them
+    curves = fit_standard_curves(standards, quantities).collect()
+    quantified = fill_copy_numbers(detections, curves.lazy()).collect()
+
+    derived = quantified.select(pl.col(flag).eq("TRUE").sum() for flag in COPY_NUMBER_FLAGS.values())
+    for quantity, count in zip(COPY_NUMBER_FLAGS, derived.row(0)):
+        note = "" if quantity in quantities else " (requires --standards)"
+        print(f"Derived {count} values of {quantity}{note}.")
+
+    # do the writing
+    curves.write_csv(args.curves_file, separator="\t")
+    quantified.write_csv(args.output_file, separator="\t")
+
+
+if __name__ == "__main__":
+    main()
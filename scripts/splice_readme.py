@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 """
-usage: splice_readme.py [-h] [-r README] [-f TALLY_FILE]
+usage: python -m scripts splice_readme [-h] [-r README] [-f TALLY_FILE]
 
 Space a table from one input markdown file into the README.
 
@@ -16,10 +16,10 @@ options:
 import argparse
 from io import TextIOWrapper
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 
-def parse_command_line_args() -> argparse.Namespace:
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     """
     Parse a couple named arguments from the command line
     """
@@ -43,7 +43,7 @@ def parse_command_line_args() -> argparse.Namespace:
         help="The file to be spliced into the readme.",
     )
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def splice_readme_lines(
@@ -72,13 +72,13 @@ def splice_readme_lines(
             continue
 
 
-def main() -> None:
+def main(argv: Optional[list[str]] = None) -> None:
     """
     Script entrypoint
     """
 
     # parse out command line args
-    args = parse_command_line_args()
+    args = parse_command_line_args(argv)
 
     # open the input readme and tally md file and collect the lines from each
     with open(args.readme, encoding="utf8") as readme_handle:
@@ -0,0 +1,110 @@
+"""
+usage: python -m scripts startup_benchmark [-h] [-n RUNS] [subcommand ...]
+
+Measure how long each subcommand takes to start by timing
+`python -m scripts <subcommand> --help` in fresh interpreters, alongside a bare
+interpreter and a bare `import polars` for reference. Results are printed as a
+markdown table of the median and fastest wall-clock time over several runs.
+
+positional arguments:
+  subcommand            Subcommands to benchmark. Defaults to all of them.
+
+options:
+  -h, --help            show this help message and exit
+  -n RUNS, --runs RUNS  Number of times to run each command.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from .cli import SUBCOMMANDS
+from .tsv_to_md import md_table
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parse the subcommands to benchmark and how many runs to time
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark how long each subcommand takes to start.",
+    )
+    parser.add_argument(
+        "subcommands",
+        metavar="subcommand",
+        nargs="*",
+        default=[],
+        help="Subcommands to benchmark. Defaults to all of them.",
+    )
+    parser.add_argument(
+        "-n",
+        "--runs",
+        type=int,
+        default=10,
+        required=False,
+        help="Number of times to run each command.",
+    )
+
+    args = parser.parse_args(argv)
+
+    # validated here rather than with `choices`, which argparse also checks
+    # against the empty default of a `nargs="*"` positional
+    unknown = [name for name in args.subcommands if name not in SUBCOMMANDS]
+    if unknown:
+        parser.error(
+            f"unknown subcommand(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(SUBCOMMANDS)})"
+        )
+
+    return args
+
+
+def time_command(command: list[str], runs: int) -> list[float]:
+    """
+    Run a command in a fresh interpreter several times and return the wall
+    clock time of each run in milliseconds.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            cwd=REPO_ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    args = parse_command_line_args(argv)
+    subcommands = args.subcommands or [
+        name for name in SUBCOMMANDS if name != "startup_benchmark"
+    ]
+
+    commands = {
+        "python -c pass": [sys.executable, "-c", "pass"],
+        "python -c 'import polars'": [sys.executable, "-c", "import polars"],
+    }
+    for name in subcommands:
+        commands[f"python -m scripts {name} --help"] = [
+            sys.executable, "-m", "scripts", name, "--help",
+        ]
+
+    table = [["Command", "Median (ms)", "Fastest (ms)"]]
+    for label, command in commands.items():
+        timings = time_command(command, args.runs)
+        table.append([label, f"{statistics.median(timings):.1f}", f"{min(timings):.1f}"])
+    print(md_table(table))
+
@@ -107,7 +107,7 @@ def csv_to_table(file, delimiter):
     return list(csv.reader(file, delimiter=delimiter))
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Read one or more CSV files and output their contents in "
         "the form of Markdown tables."
@@ -142,7 +142,7 @@ def main():
         help="The delimiter to use when parsing CSV data. " 'Default is "%(default)s"',
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     first = True
 
     if "-" in args.files and len(args.files) > 1:
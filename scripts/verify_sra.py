@@ -0,0 +1,457 @@
+"""
+This script verifies the `SRA_accession` and `SRA_bioproject` columns of the
+HPAI detection results, which `still` can only check are strings.
+
+Usage:
+    python -m scripts verify_sra <input_file> [-o <report_file>] [-b ena|fixture] [--fixture <fixture_file>]
+
+Checks:
+    - Accessions and BioProjects are well formed (e.g. `SRR29324551` and `PRJNA1121320`)
+    - Accessions and BioProjects only appear on rows where `positive_for_HPAI` is TRUE,
+      in any case
+    - Every accession exists in the SRA and belongs to the BioProject given on its row
+
+Lookups:
+    Distinct, well-formed accessions are resolved in batches through a pluggable
+    backend, with a bounded number of batches in flight at once over reused
+    connections. The default backend queries the ENA portal API, which mirrors
+    the SRA; `--base_url` points it at a stand-in server instead. The `fixture`
+    backend reads a local TSV with `run_accession` and `study_accession` columns,
+    for offline runs and tests.
+
+    Results are kept in a local JSON cache, keyed by the backend that produced
+    them, and each batch is cached as soon as it completes. Accessions that were
+    found are never looked up again, while accessions that were not found are
+    retried once their cache entry is older than `--max_age_days`. The fixture
+    backend only uses a cache when `--cache` is given, so offline runs never
+    write to the default cache.
+
+Output:
+    Any problems are printed, written to the optional report TSV with columns
+    `sample`, `SRA_accession`, `SRA_bioproject`, and `issue`, and cause the
+    script to exit with status 1. A failed lookup is reported as a single error
+    line and also exits with status 1.
+
+Required libraries:
+    - polars
+
+Example:
+    python -m scripts verify_sra -o sra_report.tsv DETECTION_RESULTS.tsv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.client
+import json
+import queue
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Protocol
+from urllib.parse import urlencode, urlsplit
+
+import polars as pl
+
+from .pipeline import atomic_write, cache_lock
+
+ACCESSION_PATTERN = r"^[SED]RR\d{6,}$"
+BIOPROJECT_PATTERN = r"^PRJ[NED][A-Z]\d+$"
+DEFAULT_BASE_URL = "https://www.ebi.ac.uk/ena/portal/api"
+DEFAULT_CACHE = Path(".pipeline_cache/sra_accessions.json")
+
+
+class AccessionLookupError(Exception):
+    """
+    Raised when a backend could not complete one or more lookups.
+    """
+
+
+class AccessionBackend(Protocol):
+    """
+    A source of truth for which run accessions exist and which BioProject
+    each belongs to. `identity` names the backend and where it reads from, so
+    that cached results from different sources are never mixed.
+    """
+
+    identity: str
+
+    async def resolve(self, accessions: list[str]) -> dict[str, str]:
+        """Map each accession in the batch that exists to its BioProject."""
+        ...
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+        ...
+
+
+def parse_run_table(text: str) -> dict[str, str]:
+    """
+    Parse a TSV with `run_accession` and `study_accession` columns into a
+    mapping from run accession to BioProject.
+    """
+    lines = text.strip().splitlines()
+    if not lines:
+        return {}
+    header = lines[0].split("\t")
+    run_index = header.index("run_accession")
+    study_index = header.index("study_accession")
+    runs = {}
+    for line in lines[1:]:
+        fields = line.split("\t")
+        runs[fields[run_index]] = fields[study_index]
+    return runs
+
+
+class FixtureBackend:
+    """
+    Resolve accessions from a local TSV with `run_accession` and
+    `study_accession` columns, in the same format the ENA portal returns.
+    """
+
+    def __init__(self, fixture_path: Path) -> None:
+        self.identity = f"fixture:{fixture_path.resolve()}"
+        with open(fixture_path, encoding="utf8") as fixture_handle:
+            self.runs = parse_run_table(fixture_handle.read())
+
+    async def resolve(self, accessions: list[str]) -> dict[str, str]:
+        return {acc: self.runs[acc] for acc in accessions if acc in self.runs}
+
+    def close(self) -> None:
+        return
+
+
+class EnaBackend:
+    """
+    Resolve accessions with the ENA portal API's search endpoint, keeping a
+    pool of persistent HTTP connections so that batches reuse them.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: float = 30.0) -> None:
+        url = urlsplit(base_url)
+        self.scheme = url.scheme
+        self.netloc = url.netloc
+        self.path = url.path.rstrip("/")
+        self.timeout = timeout
+        self.identity = f"ena:{base_url.rstrip('/')}"
+        self.pool: queue.SimpleQueue[http.client.HTTPConnection] = queue.SimpleQueue()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _search(self, accessions: list[str]) -> str:
+        body = urlencode(
+            {
+                "result": "read_run",
+                "query": " OR ".join(f"run_accession={acc}" for acc in accessions),
+                "fields": "run_accession,study_accession",
+                "format": "tsv",
+                "limit": 0,
+            }
+        )
+        try:
+            connection = self.pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.request(
+                "POST",
+                f"{self.path}/search",
+                body=body,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            response = connection.getresponse()
+            text = response.read().decode()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        # the portal answers 204 when none of the accessions exist
+        if response.status not in (200, 204):
+            connection.close()
+            raise RuntimeError(f"Accession lookup failed with HTTP {response.status}: {text}")
+        self.pool.put(connection)
+        return text
+
+    async def resolve(self, accessions: list[str]) -> dict[str, str]:
+        return parse_run_table(await asyncio.to_thread(self._search, accessions))
+
+    def close(self) -> None:
+        while not self.pool.empty():
+            self.pool.get_nowait().close()
+
+
+class AccessionCache:
+    """
+    A persistent JSON cache of accession lookups made by one backend. Entries
+    from other backends in the same file are kept but never used. Accessions
+    that were found never expire; accessions that were not found expire after
+    `max_age`. Without a path, the cache only lives for the current run.
+    """
+
+    def __init__(self, cache_path: Optional[Path], identity: str, max_age: timedelta) -> None:
+        self.cache_path = cache_path
+        self.identity = identity
+        self.max_age = max_age
+        self.backends = self.read()
+        self.entries = self.backends.setdefault(identity, {})
+
+    def read(self) -> dict[str, dict[str, dict[str, Optional[str]]]]:
+        """
+        Read every backend's entries from disk.
+        """
+        if self.cache_path is None or not self.cache_path.is_file():
+            return {}
+        with open(self.cache_path, encoding="utf8") as cache_handle:
+            return json.load(cache_handle)
+
+    def lookup(self, accessions: list[str]) -> tuple[dict[str, Optional[str]], list[str]]:
+        """
+        Split accessions into those with a usable cached result and those that
+        still need to be looked up.
+        """
+        now = datetime.now()
+        known = {}
+        stale = []
+        for accession in accessions:
+            entry = self.entries.get(accession)
+            if entry is not None and (
+                entry["project"] is not None
+                or now - datetime.fromisoformat(str(entry["checked"])) < self.max_age
+            ):
+                known[accession] = entry["project"]
+            else:
+                stale.append(accession)
+        return known, stale
+
+    def update(self, results: dict[str, Optional[str]]) -> None:
+        """
+        Record fresh lookups and write the cache back to disk atomically. The
+        file is re-read and merged while holding the pipeline's cache lock, so
+        that concurrent runs keep each other's entries.
+        """
+        checked = datetime.now().isoformat(timespec="seconds")
+        fresh = {
+            accession: {"project": project, "checked": checked}
+            for accession, project in results.items()
+        }
+        self.entries.update(fresh)
+        if self.cache_path is None:
+            return
+        with cache_lock(self.cache_path.parent):
+            self.backends = self.read()
+            self.entries = self.backends.setdefault(self.identity, {})
+            self.entries.update(fresh)
+            atomic_write(
+                self.cache_path,
+                json.dumps(self.backends, indent=2, sort_keys=True).encode(),
+            )
+
+
+async def resolve_accessions(
+    backend: AccessionBackend,
+    cache: AccessionCache,
+    accessions: list[str],
+    batch_size: int,
+    concurrency: int,
+) -> dict[str, Optional[str]]:
+    """
+    Resolve accessions in batches with at most `concurrency` batches in
+    flight, mapping accessions that do not exist to None. Each batch is
+    written to the cache as soon as it completes, so a failed batch does not
+    throw away the lookups that succeeded; the failure is then raised as an
+    `AccessionLookupError`.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    resolved: dict[str, Optional[str]] = {}
+
+    async def resolve_batch(batch: list[str]) -> None:
+        async with semaphore:
+            found = await backend.resolve(batch)
+        results = {acc: found.get(acc) for acc in batch}
+        cache.update(results)
+        resolved.update(results)
+
+    batches = [accessions[i : i + batch_size] for i in range(0, len(accessions), batch_size)]
+    outcomes = await asyncio.gather(
+        *(resolve_batch(batch) for batch in batches), return_exceptions=True
+    )
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    if errors:
+        raise AccessionLookupError(
+            f"{len(errors)} of {len(batches)} batches failed with {backend.identity}: "
+            f"{type(errors[0]).__name__}: {errors[0]}"
+        )
+    return resolved
+
+
+def parse_sra_columns(detection_results: str) -> pl.LazyFrame:
+    """
+    Parse the sample, positivity, and SRA columns from the detection results,
+    stripping whitespace, treating `NA` and empty cells as missing, and
+    upper-casing `positive_for_HPAI` the way `consistency.type_columns` does.
+
+    Args:
+        detection_results (str): Path to the input TSV file.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with the columns needed for verification.
+    """
+    return pl.scan_csv(
+        detection_results,
+        separator="\t",
+        infer_schema_length=0,
+        null_values=["NA", ""],
+    ).select(
+        "sample",
+        pl.col("positive_for_HPAI").str.to_uppercase(),
+        pl.col("SRA_accession").str.strip_chars(),
+        pl.col("SRA_bioproject").str.strip_chars(),
+    )
+
+
+def check_row_consistency(sra_columns: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Check accession formats and that SRA data only appears on positive rows.
+
+    Args:
+        sra_columns (pl.LazyFrame): A LazyFrame from `parse_sra_columns`.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with one row per problem found.
+    """
+    accession = pl.col("SRA_accession")
+    bioproject = pl.col("SRA_bioproject")
+    checks = [
+        (
+            accession.is_not_null() & ~accession.str.contains(ACCESSION_PATTERN),
+            "malformed SRA accession",
+        ),
+        (
+            bioproject.is_not_null() & ~bioproject.str.contains(BIOPROJECT_PATTERN),
+            "malformed BioProject",
+        ),
+        (
+            (accession.is_not_null() | bioproject.is_not_null())
+            & pl.col("positive_for_HPAI").ne("TRUE"),
+            "SRA data on a row that is not positive for HPAI",
+        ),
+        (
+            accession.is_not_null() & bioproject.is_null(),
+            "SRA accession without a BioProject",
+        ),
+    ]
+    return pl.concat(
+        [
+            sra_columns.filter(failed).select(
+                "sample", "SRA_accession", "SRA_bioproject", pl.lit(issue).alias("issue")
+            )
+            for failed, issue in checks
+        ]
+    )
+
+
+def check_project_mapping(
+    sra_columns: pl.LazyFrame,
+    resolved: dict[str, Optional[str]],
+) -> pl.LazyFrame:
+    """
+    Check that every resolved accession exists and belongs to the BioProject
+    given on its row.
+
+    Args:
+        sra_columns (pl.LazyFrame): A LazyFrame from `parse_sra_columns`.
+        resolved (dict[str, Optional[str]]): BioProject for each accession, or
+        None for accessions that do not exist.
+
+    Returns:
+        pl.LazyFrame: A LazyFrame with one row per problem found.
+    """
+    lookups = pl.LazyFrame(
+        {"SRA_accession": list(resolved), "resolved_project": list(resolved.values())},
+        schema={"SRA_accession": pl.String, "resolved_project": pl.String},
+    )
+    project = pl.col("resolved_project")
+    return (
+        sra_columns.join(lookups, on="SRA_accession", how="inner")
+        .with_columns(
+            pl.when(project.is_null())
+            .then(pl.lit("SRA accession not found"))
+            .when(pl.col("SRA_bioproject").is_not_null() & project.ne(pl.col("SRA_bioproject")))
+            .then(pl.lit("SRA accession belongs to ") + project)
+            .alias("issue")
+        )
+        .filter(pl.col("issue").is_not_null())
+        .select("sample", "SRA_accession", "SRA_bioproject", "issue")
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    # pull input and output information from the command line
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--report', default=None, required=False, help="Optional path where a TSV of problems will be saved.")
+    parser.add_argument('-b', '--backend', choices=["ena", "fixture"], default="ena", help="Where to look up accessions.")
+    parser.add_argument('--fixture', type=Path, default=None, help="TSV of run_accession and study_accession for the fixture backend.")
+    parser.add_argument('--base_url', default=DEFAULT_BASE_URL, help="Base URL of the ENA portal API or a stand-in server.")
+    parser.add_argument('--cache', type=Path, default=None, help=f"Path to the persistent accession cache. Defaults to {DEFAULT_CACHE} for the ena backend and to no cache for the fixture backend.")
+    parser.add_argument('--max_age_days', type=int, default=30, help="Days before accessions that were not found are looked up again.")
+    parser.add_argument('--batch_size', type=int, default=100, help="Accessions per lookup request.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Lookup requests in flight at once.")
+    parser.add_argument('input_file', help="Path to the input TSV file containing detection results.")
+
+    args = parser.parse_args(argv)
+
+    # check formats and positivity for every row, and collect the distinct,
+    # well-formed accessions in the same pass
+    sra_columns = parse_sra_columns(args.input_file)
+    row_issues, accessions = pl.collect_all(
+        [
+            check_row_consistency(sra_columns),
+            sra_columns.select(
+                pl.col("SRA_accession")
+                .filter(pl.col("SRA_accession").str.contains(ACCESSION_PATTERN))
+                .unique()
+                .sort()
+            ),
+        ]
+    )
+
+    if args.backend == "fixture":
+        if args.fixture is None:
+            parser.error("the fixture backend requires --fixture")
+        backend: AccessionBackend = FixtureBackend(args.fixture)
+        cache_path = args.cache
+    else:
+        backend = EnaBackend(args.base_url)
+        cache_path = args.cache if args.cache is not None else DEFAULT_CACHE
+
+    # only look up accessions without a usable cached result from this backend
+    cache = AccessionCache(cache_path, backend.identity, timedelta(days=args.max_age_days))
+    resolved, stale = cache.lookup(accessions.to_series().to_list())
+    if stale:
+        try:
+            fresh = asyncio.run(
+                resolve_accessions(backend, cache, stale, args.batch_size, args.concurrency)
+            )
+        except AccessionLookupError as error:
+            print(f"SRA accession lookup failed: {error}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            backend.close()
+        resolved.update(fresh)
+    print(f"Verified {len(resolved)} SRA accessions ({len(stale)} looked up).")
+
+    issues = pl.concat([row_issues, check_project_mapping(sra_columns, resolved).collect()])
+    if args.report is not None:
+        issues.write_csv(args.report, separator="\t")
+
+    # report any problems and exit with status 1
+    if issues.height > 0:
+        print(f"The following SRA metadata problems were found:\n{issues}")
+        sys.exit(1)
+
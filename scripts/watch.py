@@ -0,0 +1,396 @@
+"""
+usage: python -m scripts watch [-h] [-i DATA] [-a ASSETS_DIR] [-r README]
+                               [-d DAYS_PREVIOUS] [--interval INTERVAL]
+                               [--debounce DEBOUNCE] [--metrics METRICS] [--once]
+
+Keep the detection results warm in a long-running process and republish the
+tallies and README within seconds of the data changing.
+
+The data file and the assets directory are polled with `os.stat`, which is
+cheap enough to run every second, and bursts of writes are debounced until
+the files have been quiet for `--debounce` seconds. The parsed table and the
+last tallies are kept in memory, and on each change only what is affected is
+recomputed:
+
+- a change in the content of the data file re-parses it and recomputes both
+  tallies, rewriting only the tables and README sections that changed;
+- a change in the assets directory re-checks that every primer and probe
+  file named in the table is present;
+- the recent tally is also recomputed when the date rolls over.
+
+A change that leaves the content of the data file and the list of asset files
+as they were is skipped. Every output is written atomically. A run that fails,
+e.g. because the data file is missing or only half written, is logged and
+leaves the previous state in place, so the next change is compared against
+the last run that succeeded. After a failed run, nothing is retried, not even
+the date rollover, until the watched files change again. After each run, the latency of the last run, rows
+processed, and number of runs, skipped runs, and failed runs are written to the
+`--metrics` JSON file.
+
+options:
+  -h, --help            show this help message and exit
+  -i DATA, --data DATA  The detection results to watch.
+  -a ASSETS_DIR, --assets_dir ASSETS_DIR
+                        The assets directory to watch and write tallies into.
+  -r README, --readme README
+                        The README to splice the tallies into.
+  -d DAYS_PREVIOUS, --days_previous DAYS_PREVIOUS
+                        Number of days before today covered by the recent tally.
+  --interval INTERVAL   Seconds between polls.
+  --debounce DEBOUNCE   Seconds the watched files must be quiet before a run.
+  --metrics METRICS     Where to write run metrics as JSON.
+  --once                Run once and exit instead of watching.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+
+from . import splice_readme, splice_recent
+from .pipeline import atomic_write
+from .positivity_tally import parse_input_results, tally_detections
+from .tsv_to_md import md_table
+
+
+def parse_command_line_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """
+    Parse the watched paths and a few tuning knobs from the command line
+    """
+    parser = argparse.ArgumentParser(
+        description="Republish the tallies and README whenever the detection results change.",
+    )
+    parser.add_argument(
+        "-i",
+        "--data",
+        type=Path,
+        default=Path("DETECTION_RESULTS.tsv"),
+        required=False,
+        help="The detection results to watch.",
+    )
+    parser.add_argument(
+        "-a",
+        "--assets_dir",
+        type=Path,
+        default=Path("assets"),
+        required=False,
+        help="The assets directory to watch and write tallies into.",
+    )
+    parser.add_argument(
+        "-r",
+        "--readme",
+        type=Path,
+        default=Path("README.md"),
+        required=False,
+        help="The README to splice the tallies into.",
+    )
+    parser.add_argument(
+        "-d",
+        "--days_previous",
+        type=int,
+        default=90,
+        required=False,
+        help="Number of days before today covered by the recent tally.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        required=False,
+        help="Seconds between polls.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        required=False,
+        help="Seconds the watched files must be quiet before a run.",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=Path(".pipeline_cache/watch_metrics.json"),
+        required=False,
+        help="Where to write run metrics as JSON.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Run once and exit instead of watching.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def render_tally(tally: pl.DataFrame) -> tuple[str, str]:
+    """
+    Render a tally as the TSV that `positivity_tally` writes and the markdown
+    table that `tsv_to_md` makes from it.
+    """
+    tsv = tally.write_csv(separator="\t")
+    table = list(csv.reader(io.StringIO(tsv), delimiter="\t"))
+    return tsv, f"{md_table(table)}\n"
+
+
+def splice(splicer, readme: str, markdown: str) -> str:
+    """
+    Splice a markdown table into the README text with one of the existing
+    `splice_readme_lines` functions.
+    """
+    new_readme = io.StringIO()
+    splicer.splice_readme_lines(
+        readme.splitlines(keepends=True),
+        markdown.splitlines(keepends=True),
+        new_readme,
+    )
+    return new_readme.getvalue()
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """
+    Atomically write text to a path unless it already holds exactly that text.
+    """
+    if path.is_file() and path.read_text(encoding="utf8") == text:
+        return False
+    atomic_write(path, text.encode("utf8"))
+    return True
+
+
+def find_missing_assets(detections: pl.DataFrame, asset_files: frozenset[str]) -> list[str]:
+    """
+    List primer and probe files named in the table that are not in the
+    assets directory.
+    """
+    named = (
+        detections.select(
+            pl.concat_list("primer_asset_file", "probe_asset_file").alias("file")
+        )
+        .explode("file")
+        .filter(pl.col("file").is_not_null() & (pl.col("file").str.to_uppercase() != "REDACTED"))
+        .unique()
+        .to_series()
+        .to_list()
+    )
+    return sorted(set(named) - asset_files)
+
+
+class Watcher:
+    """
+    The state kept warm between runs: the parsed table, the last tallies, and
+    the metrics reported after each run.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.outputs = {
+            "tally": args.assets_dir / "positivity_tally.tsv",
+            "tally_md": args.assets_dir / "positivity_tally.md",
+            "recent": args.assets_dir / "recent_tally.tsv",
+            "recent_md": args.assets_dir / "recent_tally.md",
+        }
+        self.detections: Optional[pl.DataFrame] = None
+        self.data_hash: Optional[str] = None
+        self.asset_files: Optional[frozenset[str]] = None
+        self.tallies: dict[str, pl.DataFrame] = {}
+        self.tally_date: Optional[date] = None
+        self.metrics = {
+            "runs": 0,
+            "skipped_unchanged": 0,
+            "failed_runs": 0,
+            "last_error": None,
+            "last_run_latency_ms": None,
+            "last_rows_processed": 0,
+            "rows_processed": 0,
+            "missing_asset_files": [],
+            "last_written": [],
+        }
+
+    def snapshot(self) -> dict[str, tuple[int, int]]:
+        """
+        Stat the data file and every file in the assets directory, leaving
+        out the tallies this watcher writes itself and hidden temporary files.
+        """
+        ignored = {path.name for path in self.outputs.values()}
+        stats = {}
+        paths = [self.args.data]
+        if self.args.assets_dir.is_dir():
+            with os.scandir(self.args.assets_dir) as entries:
+                paths.extend(
+                    Path(e.path)
+                    for e in entries
+                    if e.name not in ignored and not e.name.startswith(".")
+                )
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            stats[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def run(self) -> None:
+        """
+        Recompute whatever the latest change affects and republish it. The
+        state kept between runs is only updated once everything has been
+        written, so a run that raises leaves it as it was.
+        """
+        start = time.perf_counter()
+        written = []
+
+        data = self.args.data.read_bytes()
+        data_hash = hashlib.sha256(data).hexdigest()
+        ignored = {path.name for path in self.outputs.values()}
+        asset_files = frozenset(
+            name for name in os.listdir(self.args.assets_dir) if not name.startswith(".")
+        ) - ignored
+        data_changed = data_hash != self.data_hash
+        assets_changed = asset_files != self.asset_files
+        date_changed = date.today() != self.tally_date
+
+        if not (data_changed or assets_changed or date_changed):
+            self.metrics["skipped_unchanged"] += 1
+            self.report("skipped as unchanged", start, rows=0, written=written)
+            return
+
+        detections = self.detections
+        if data_changed:
+            detections = parse_input_results(io.BytesIO(data)).collect()
+        assert detections is not None
+
+        missing_asset_files = self.metrics["missing_asset_files"]
+        if data_changed or assets_changed:
+            missing_asset_files = find_missing_assets(detections, asset_files)
+
+        readme = self.args.readme.read_text(encoding="utf8")
+        new_readme = readme
+        tallies: dict[str, pl.DataFrame] = {}
+        recompute = {"tally": data_changed, "recent": data_changed or date_changed}
+        for name, needed in recompute.items():
+            if not needed:
+                continue
+            days_previous = self.args.days_previous if name == "recent" else None
+            tally = tally_detections(detections.lazy(), days_previous).collect()
+            # a README whose recent heading is stamped with an old date needs
+            # rewriting even if the recent tally itself did not change
+            if name in self.tallies and tally.equals(self.tallies[name]) and not (
+                name == "recent" and date_changed
+            ):
+                continue
+            tallies[name] = tally
+            tsv, markdown = render_tally(tally)
+            if write_if_changed(self.outputs[name], tsv):
+                written.append(str(self.outputs[name]))
+            if write_if_changed(self.outputs[f"{name}_md"], markdown):
+                written.append(str(self.outputs[f"{name}_md"]))
+            splicer = splice_recent if name == "recent" else splice_readme
+            new_readme = splice(splicer, new_readme, markdown)
+
+        if new_readme != readme and write_if_changed(self.args.readme, new_readme):
+            written.append(str(self.args.readme))
+
+        self.detections = detections
+        self.data_hash = data_hash
+        self.asset_files = asset_files
+        self.tallies.update(tallies)
+        self.tally_date = date.today()
+        self.metrics["missing_asset_files"] = missing_asset_files
+        self.metrics["runs"] += 1
+        self.report(
+            f"run {self.metrics['runs']}",
+            start,
+            rows=detections.height if data_changed else 0,
+            written=written,
+        )
+
+    def try_run(self) -> bool:
+        """
+        Run, logging a missing or unparseable file instead of raising, and
+        counting the run as failed. Returns whether the run succeeded.
+        """
+        start = time.perf_counter()
+        try:
+            self.run()
+        except (OSError, pl.exceptions.PolarsError) as error:
+            self.metrics["failed_runs"] += 1
+            # polars appends the query plan to its errors; the first line says what went wrong
+            message = str(error).splitlines()[0] if str(error) else ""
+            self.metrics["last_error"] = f"{type(error).__name__}: {message}"
+            self.report("failed, keeping the previous outputs", start, rows=0, written=[])
+            print(self.metrics["last_error"], file=sys.stderr)
+            return False
+        self.metrics["last_error"] = None
+        return True
+
+    def report(self, status: str, start: float, rows: int, written: list[str]) -> None:
+        """
+        Update the run metrics and write them out.
+        """
+        self.metrics["last_run_latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        self.metrics["last_rows_processed"] = rows
+        self.metrics["rows_processed"] += rows
+        self.metrics["last_written"] = written
+        atomic_write(self.args.metrics, json.dumps(self.metrics, indent=2).encode())
+        print(
+            f"{status}: {self.metrics['last_run_latency_ms']} ms, "
+            f"{rows} rows, wrote {len(written)} file(s)",
+            file=sys.stderr,
+        )
+        if self.metrics["missing_asset_files"]:
+            print(
+                f"Files named in the table are missing from assets: {self.metrics['missing_asset_files']}",
+                file=sys.stderr,
+            )
+
+    def watch(self) -> None:
+        """
+        Poll the watched files forever, running once they have been quiet for
+        the debounce period after a change, or when the date rolls over.
+        """
+        last_snapshot = self.snapshot()
+        last_change: Optional[float] = None
+        # a failed run would fail the same way on every poll, so wait for the
+        # files to change instead of retrying the date rollover
+        waiting_for_change = self.tally_date is None
+        while True:
+            time.sleep(self.args.interval)
+            snapshot = self.snapshot()
+            if snapshot != last_snapshot:
+                last_snapshot = snapshot
+                last_change = time.monotonic()
+            elif last_change is not None and time.monotonic() - last_change >= self.args.debounce:
+                last_change = None
+                waiting_for_change = not self.try_run()
+            elif not waiting_for_change and date.today() != self.tally_date:
+                waiting_for_change = not self.try_run()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Script entrypoint
+    """
+    args = parse_command_line_args(argv)
+    watcher = Watcher(args)
+
+    # always start from a fresh run so the outputs match the data on disk
+    succeeded = watcher.try_run()
+    if args.once:
+        if not succeeded:
+            sys.exit(1)
+        return
+
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        pass
+
@@ -0,0 +1,46 @@
+from datetime import date
+
+import polars as pl
+
+from scripts.batch_qc import flag_outlier_wells, parse_sample_identifiers, summarize_batches
+
+
+def detections(ct: dict[str, str]) -> pl.LazyFrame:
+    samples = list(ct)
+    return pl.LazyFrame(
+        {
+            "sample": samples,
+            "carton": [f"dholab_carton_{i:04d}" for i in range(1, len(samples) + 1)],
+            "average_cycle_threshold": list(ct.values()),
+            "date_expiration": ["2025-01-20"] * len(samples),
+            "date_purchased": [date(2025, 1, 1)] * len(samples),
+            "positive_for_HPAI": [True] * len(samples),
+        }
+    )
+
+
+def test_outlier_wells_are_listed_and_left_missing_when_none():
+    batch_qc = summarize_batches(
+        flag_outlier_wells(
+            parse_sample_identifiers(
+                detections(
+                    {
+                        "dholab_1_01": "30.1",
+                        "dholab_1_02": "30.3",
+                        "dholab_1_03": "30.2",
+                        "dholab_1_04": "30.4",
+                        "dholab_1_05": "38.9",
+                        "dholab_2_01": "30.1",
+                        "dholab_2_02": "30.2",
+                        "dholab_2_03": "NA",
+                    }
+                )
+            )
+        )
+    ).collect()
+
+    assert batch_qc.select("Batch", "Samples", "Outlier Wells").rows() == [
+        (1, 5, "5"),
+        (2, 3, None),
+    ]
+    assert batch_qc.write_csv(separator="\t").splitlines()[2].endswith("\t")
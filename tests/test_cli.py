@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from scripts.cli import SUBCOMMANDS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    # each check runs in a fresh interpreter, since this one has already
+    # imported polars for the other tests
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.mark.parametrize("subcommand", ["batch_qc", "quantify", "watch", "pipeline"])
+def test_help_does_not_load_polars(subcommand):
+    result = run_python("-m", "scripts", "--time-startup", subcommand, "--help")
+    assert "usage: python -m scripts" in result.stdout
+    assert "(loaded: polars=False)" in result.stderr
+
+
+def test_missed_lookup_after_load_leaves_polars_importable():
+    check = textwrap.dedent(
+        """
+        import sys
+        from scripts.cli import is_loaded, lazy_import
+
+        lazy_import("polars")
+        import polars as pl
+        assert not is_loaded("polars")
+
+        assert pl.DataFrame({"a": [1, 2]}).height == 2
+        assert is_loaded("polars")
+
+        assert not hasattr(pl, "no_such_attribute")
+        assert getattr(pl, "no_such_attribute", None) is None
+        assert "polars" in sys.modules
+
+        import polars
+        assert polars.DataFrame({"a": [1]}).height == 1
+        assert pl.col is polars.col
+        """
+    )
+    run_python("-c", check)
+
+
+def test_every_subcommand_module_exists():
+    for module, _ in SUBCOMMANDS.values():
+        assert (REPO_ROOT / "scripts" / f"{module}.py").is_file()
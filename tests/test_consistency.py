@@ -0,0 +1,75 @@
+import asyncio
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from scripts.consistency import check_consistency, find_violations, read_rules
+
+RULES = Path(__file__).resolve().parent.parent / "assets" / "consistency_rules.tsv"
+
+COLUMNS = (
+    "sample",
+    "carton",
+    "date_purchased",
+    "date_expiration",
+    "date_contributed",
+    "average_cycle_threshold",
+    "isolate_average_copies_per_uL",
+    "dairyproduct_average_copies_per_mL",
+    "positive_for_HPAI",
+    "processing_plant_state",
+)
+CLEAN_ROW = ("s", "c", "2024-12-01", "2024-12-20", "2025-01-05", "NA", "NA", "NA", "FALSE", "WI")
+
+
+def table(*rows: dict[str, str]) -> pl.LazyFrame:
+    """
+    Build a table the way `pl.scan_csv(..., infer_schema_length=0)` reads one,
+    with every column as text, from clean rows with a few fields overridden.
+    """
+    records = [{**dict(zip(COLUMNS, CLEAN_ROW)), **row} for row in rows]
+    return pl.LazyFrame(records, schema={column: pl.String for column in COLUMNS})
+
+
+def test_each_shipped_rule_is_reported_with_its_line_and_severity():
+    violations = find_violations(
+        table(
+            {"sample": "clean", "carton": "c1"},
+            {"sample": "ct_neg", "carton": "c2", "average_cycle_threshold": "31.2"},
+            {"sample": "no_ct", "carton": "c3", "positive_for_HPAI": "true"},
+            {"sample": "expired", "carton": "c4", "date_expiration": "2024-11-01"},
+            {"sample": "early", "carton": "c5", "date_contributed": "2024-11-01"},
+            {"sample": "wi", "carton": "c6", "processing_plant_state": "WI"},
+            {"sample": "mn", "carton": "c6", "processing_plant_state": "MN"},
+            {"sample": "state_na", "carton": "c6", "processing_plant_state": "NA"},
+            {"sample": "other_wi", "carton": "c7", "processing_plant_state": "WI"},
+            {"sample": "other_na", "carton": "c7", "processing_plant_state": "NA"},
+        ),
+        read_rules(RULES),
+    )
+
+    assert violations.select("line", "sample", "rule_id", "severity").rows() == [
+        (3, "ct_neg", "ct_on_negative", "warning"),
+        (4, "no_ct", "missing_ct_on_positive", "warning"),
+        (5, "expired", "expiration_before_purchase", "warning"),
+        (6, "early", "contributed_before_purchase", "error"),
+        (7, "wi", "carton_state_conflict", "error"),
+        (8, "mn", "carton_state_conflict", "error"),
+    ]
+
+
+def test_errors_exit_and_warnings_only_print(tmp_path, capsys):
+    warning_only = table({"sample": "ct_neg", "average_cycle_threshold": "31.2"})
+    asyncio.run(check_consistency(warning_only, RULES))
+    assert "ct_on_negative" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit_info:
+        asyncio.run(check_consistency(table({"date_contributed": "2024-11-01"}), RULES))
+    assert exit_info.value.code == 1
+    assert "contributed_before_purchase" in capsys.readouterr().out
+
+
+def test_clean_table_passes(capsys):
+    asyncio.run(check_consistency(table({}), RULES))
+    assert capsys.readouterr().out == "All consistency rules passed.\n"
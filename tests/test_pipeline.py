@@ -0,0 +1,157 @@
+import os
+import stat
+from pathlib import Path
+
+from scripts import pipeline
+from scripts.pipeline import (
+    Stage,
+    atomic_write,
+    bring_up_to_date,
+    default_file_mode,
+    define_stages,
+    load_manifest,
+    stage_key,
+)
+
+
+def file_mode(path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_atomic_write_keeps_the_mode_of_the_file_it_replaces(tmp_path):
+    path = tmp_path / "README.md"
+    path.write_text("old\n")
+    os.chmod(path, 0o644)
+
+    atomic_write(path, b"new\n")
+
+    assert path.read_bytes() == b"new\n"
+    assert file_mode(path) == 0o644
+
+
+def test_atomic_write_gives_new_files_the_umask_mode(tmp_path):
+    path = tmp_path / "assets" / "recent_tally.md"
+    old_umask = os.umask(0o022)
+    try:
+        atomic_write(path, b"table\n")
+        assert default_file_mode() == 0o644
+    finally:
+        os.umask(old_umask)
+
+    assert file_mode(path) == 0o644
+    assert [p.name for p in path.parent.iterdir()] == ["recent_tally.md"]
+
+
+def markdown_stage(tmp_path: Path) -> Stage:
+    return Stage(
+        name="tally_md",
+        command="tsv_to_md",
+        args=("{tally}",),
+        inputs={"tally": tmp_path / "tally.tsv"},
+        outputs={},
+        stdout=tmp_path / "tally.md",
+    )
+
+
+def test_second_run_is_cached_and_changed_input_reruns(tmp_path):
+    cache_dir = tmp_path / "cache"
+    tally = tmp_path / "tally.tsv"
+    tally.write_text("State\tCartons\nWI\t72\n")
+    stage = markdown_stage(tmp_path)
+
+    assert bring_up_to_date(stage, cache_dir) == ("ran", 0)
+    assert "WI" in (tmp_path / "tally.md").read_text()
+    assert bring_up_to_date(stage, cache_dir) == ("cached", 0)
+
+    tally.write_text("State\tCartons\nWI\t73\n")
+    assert bring_up_to_date(stage, cache_dir) == ("ran", 0)
+    assert "73" in (tmp_path / "tally.md").read_text()
+
+    # going back to inputs seen before publishes the cached outputs again
+    tally.write_text("State\tCartons\nWI\t72\n")
+    assert bring_up_to_date(stage, cache_dir) == ("cached", 0)
+    assert "73" not in (tmp_path / "tally.md").read_text()
+
+
+def test_manifest_with_missing_objects_reruns(tmp_path):
+    cache_dir = tmp_path / "cache"
+    (tmp_path / "tally.tsv").write_text("State\tCartons\nWI\t72\n")
+    stage = markdown_stage(tmp_path)
+    bring_up_to_date(stage, cache_dir)
+
+    manifest = load_manifest(cache_dir, stage_key(stage))
+    assert manifest is not None
+    for object_hash in manifest.values():
+        (cache_dir / "objects" / object_hash[:2] / object_hash).unlink()
+
+    assert load_manifest(cache_dir, stage_key(stage)) is None
+    assert bring_up_to_date(stage, cache_dir) == ("ran", 0)
+
+
+def test_inputs_changed_while_running_rerun_before_publishing(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    tally = tmp_path / "tally.tsv"
+    tally.write_text("State\tCartons\nWI\t72\n")
+    stage = markdown_stage(tmp_path)
+    real_run_stage = pipeline.run_stage
+    runs = []
+
+    def racing_run_stage(stage: Stage, cache_dir: Path) -> dict[str, str]:
+        manifest = real_run_stage(stage, cache_dir)
+        runs.append(manifest)
+        if len(runs) == 1:
+            # another runner publishes a new tally while this one runs
+            tally.write_text("State\tCartons\nWI\t99\n")
+        return manifest
+
+    monkeypatch.setattr(pipeline, "run_stage", racing_run_stage)
+    assert bring_up_to_date(stage, cache_dir) == ("ran", 1)
+    assert len(runs) == 2
+    assert "99" in (tmp_path / "tally.md").read_text()
+
+
+def test_stages_run_in_their_own_scratch_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache_dir = tmp_path / "cache"
+    (tmp_path / "README.md").write_text(
+        "# Title\n\n## All-time Results by State\n\nold\n\n## Next\n"
+    )
+    (tmp_path / "tally.md").write_text("State | Cartons\n------|--------\nWI    | 72\n")
+    stage = Stage(
+        name="readme",
+        command="splice_readme",
+        args=("--readme", "{readme}", "--tally_file", "{tally}"),
+        inputs={"readme": tmp_path / "README.md", "tally": tmp_path / "tally.md"},
+        outputs={"new_readme.md": tmp_path / "README.md"},
+    )
+
+    assert bring_up_to_date(stage, cache_dir) == ("ran", 0)
+    assert "WI    | 72" in (tmp_path / "README.md").read_text()
+    # the script's fixed output name never lands in the working directory, and
+    # the scratch directory is cleaned up
+    assert not (tmp_path / "new_readme.md").exists()
+    assert sorted(p.name for p in cache_dir.iterdir()) == ["lock", "objects", "stages"]
+
+
+def test_normalize_is_keyed_on_the_assets_it_reads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "DETECTION_RESULTS.tsv").write_text(
+        "sample\tprimer_asset_file\tprobe_asset_file\n"
+        "a_1_01\tprimers.fasta\tREDACTED\n"
+    )
+    (tmp_path / "assets" / "primers.fasta").write_text(">p\nACGT\n")
+    (tmp_path / "assets" / "consistency_rules.tsv").write_text("rule_id\n")
+    normalize = next(stage for stage in define_stages(90) if stage.name == "normalize")
+    key = stage_key(normalize)
+
+    # tallies other stages publish into assets/ leave the key alone
+    (tmp_path / "assets" / "positivity_tally.tsv").write_text("State\nWI\n")
+    assert stage_key(normalize) == key
+
+    (tmp_path / "assets" / "primers.fasta").write_text(">p\nACGA\n")
+    assert stage_key(normalize) != key
+    key = stage_key(normalize)
+
+    (tmp_path / "assets" / "consistency_rules.tsv").write_text("rule_id\tseverity\n")
+    assert stage_key(normalize) != key
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import polars as pl
+import pytest
+
+from scripts.quantify import fill_copy_numbers, fit_standard_curves
+
+ASSAY = {"assay": "qPCR", "primer_asset_file": "p.fasta", "probe_asset_file": "q.fasta"}
+
+
+def standards(ct: list[float], copies: list[float], assay: str = "qPCR") -> pl.LazyFrame:
+    return pl.LazyFrame(
+        {
+            **{key: [value] * len(ct) for key, value in {**ASSAY, "assay": assay}.items()},
+            "average_cycle_threshold": [str(value) for value in ct],
+            "isolate_average_copies_per_uL": [str(value) for value in copies],
+            "dairyproduct_average_copies_per_mL": ["NA"] * len(ct),
+        }
+    )
+
+
+def test_fit_recovers_a_known_curve():
+    copies = [10.0**exponent for exponent in range(1, 7)]
+    ct = [-3.32 * math.log10(c) + 40.0 for c in copies]
+
+    curves = fit_standard_curves(standards(ct, copies), ["isolate_average_copies_per_uL"]).collect()
+
+    assert curves.height == 1
+    curve = curves.row(0, named=True)
+    assert curve["points"] == 6
+    assert curve["slope"] == pytest.approx(-3.32)
+    assert curve["intercept"] == pytest.approx(40.0)
+    assert curve["r_squared"] == pytest.approx(1.0)
+    assert curve["efficiency"] == pytest.approx(10 ** (1 / 3.32) - 1)
+
+
+def test_fit_matches_least_squares_on_noisy_points():
+    copies = [1e2, 1e3, 1e4, 1e5, 1e6]
+    ct = [33.1, 29.9, 26.2, 23.3, 19.6]
+
+    curve = fit_standard_curves(standards(ct, copies, assay="noisy")).collect().row(0, named=True)
+
+    slope, intercept = np.polyfit(np.log10(copies), ct, 1)
+    r = np.corrcoef(np.log10(copies), ct)[0, 1]
+    assert curve["quantity"] == "isolate_average_copies_per_uL"
+    assert curve["slope"] == pytest.approx(slope)
+    assert curve["intercept"] == pytest.approx(intercept)
+    assert curve["r_squared"] == pytest.approx(r**2)
+    assert curve["efficiency"] == pytest.approx(10 ** (-1 / slope) - 1)
+
+
+def test_fill_only_touches_missing_copies_on_positive_rows():
+    copies = [10.0**exponent for exponent in range(1, 5)]
+    ct = [-3.32 * math.log10(c) + 40.0 for c in copies]
+    curves = fit_standard_curves(standards(ct, copies), ["isolate_average_copies_per_uL"])
+    detections = pl.LazyFrame(
+        {
+            **{key: [value] * 3 for key, value in ASSAY.items()},
+            "average_cycle_threshold": ["33.36", "33.36", "NA"],
+            "isolate_average_copies_per_uL": ["NA", "NA", "NA"],
+            "dairyproduct_average_copies_per_mL": ["NA", "", "NA"],
+            "positive_for_HPAI": ["TRUE", "FALSE", "TRUE"],
+        }
+    )
+
+    filled = fill_copy_numbers(detections, curves).collect()
+
+    assert filled["isolate_average_copies_per_uL"].to_list() == ["100.0", "NA", "NA"]
+    assert filled["isolate_copies_derived"].to_list() == ["TRUE", "FALSE", "FALSE"]
+    assert filled["dairyproduct_average_copies_per_mL"].to_list() == ["NA", "", "NA"]
+    assert filled["dairyproduct_copies_derived"].to_list() == ["FALSE", "FALSE", "FALSE"]
@@ -0,0 +1,193 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from scripts.verify_sra import (
+    AccessionCache,
+    AccessionLookupError,
+    FixtureBackend,
+    check_project_mapping,
+    check_row_consistency,
+    main,
+    parse_sra_columns,
+    resolve_accessions,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sra_runs.tsv"
+MAX_AGE = timedelta(days=30)
+
+
+class CountingBackend(FixtureBackend):
+    """
+    A fixture backend that records every batch it is asked to resolve, and
+    fails on any batch containing an accession in `failing`.
+    """
+
+    def __init__(self, fixture_path: Path, failing: frozenset[str] = frozenset()) -> None:
+        super().__init__(fixture_path)
+        self.failing = failing
+        self.batches: list[list[str]] = []
+
+    async def resolve(self, accessions: list[str]) -> dict[str, str]:
+        self.batches.append(accessions)
+        if self.failing.intersection(accessions):
+            raise ConnectionRefusedError("stand-in is down")
+        return await super().resolve(accessions)
+
+
+def write_detections(path: Path, rows: list[tuple[str, str, str]]) -> Path:
+    lines = ["sample\tpositive_for_HPAI\tSRA_accession\tSRA_bioproject"]
+    lines.extend(f"{sample}\tTRUE\t{acc}\t{project}" for sample, acc, project in rows)
+    path.write_text("\n".join(lines) + "\n", encoding="utf8")
+    return path
+
+
+def test_cache_hits_are_not_looked_up_again(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    backend = CountingBackend(FIXTURE)
+    accessions = ["SRR00000001", "SRR29324548", "SRR29324549"]
+
+    cache = AccessionCache(cache_path, backend.identity, MAX_AGE)
+    asyncio.run(resolve_accessions(backend, cache, accessions, 2, 2))
+    assert sorted(acc for batch in backend.batches for acc in batch) == accessions
+
+    known, stale = AccessionCache(cache_path, backend.identity, MAX_AGE).lookup(accessions)
+    assert stale == []
+    assert known == {
+        "SRR29324548": "PRJNA1121320",
+        "SRR29324549": "PRJNA1121320",
+        "SRR00000001": None,
+    }
+
+
+def test_misses_expire_but_found_accessions_do_not(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    backend = FixtureBackend(FIXTURE)
+    long_ago = (datetime.now() - MAX_AGE * 2).isoformat(timespec="seconds")
+    cache_path.write_text(
+        json.dumps(
+            {
+                backend.identity: {
+                    "SRR29324548": {"project": "PRJNA1121320", "checked": long_ago},
+                    "SRR00000001": {"project": None, "checked": long_ago},
+                }
+            }
+        ),
+        encoding="utf8",
+    )
+
+    known, stale = AccessionCache(cache_path, backend.identity, MAX_AGE).lookup(
+        ["SRR29324548", "SRR00000001"]
+    )
+    assert known == {"SRR29324548": "PRJNA1121320"}
+    assert stale == ["SRR00000001"]
+
+
+def test_cache_is_keyed_by_backend(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    backend = FixtureBackend(FIXTURE)
+    cache = AccessionCache(cache_path, backend.identity, MAX_AGE)
+    asyncio.run(resolve_accessions(backend, cache, ["SRR29324548", "SRR00000001"], 10, 1))
+
+    known, stale = AccessionCache(cache_path, "ena:https://example.org", MAX_AGE).lookup(
+        ["SRR29324548", "SRR00000001"]
+    )
+    assert known == {}
+    assert stale == ["SRR29324548", "SRR00000001"]
+
+
+def test_failed_batch_keeps_the_batches_that_succeeded(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    backend = CountingBackend(FIXTURE, failing=frozenset({"SRR31094751"}))
+    cache = AccessionCache(cache_path, backend.identity, MAX_AGE)
+
+    with pytest.raises(AccessionLookupError, match="1 of 2 batches failed"):
+        asyncio.run(
+            resolve_accessions(backend, cache, ["SRR29324548", "SRR29324549", "SRR31094751"], 2, 2)
+        )
+
+    known, stale = AccessionCache(cache_path, backend.identity, MAX_AGE).lookup(
+        ["SRR29324548", "SRR29324549", "SRR31094751"]
+    )
+    assert known == {"SRR29324548": "PRJNA1121320", "SRR29324549": "PRJNA1121320"}
+    assert stale == ["SRR31094751"]
+
+
+def test_project_mismatch_and_missing_accessions_are_reported():
+    sra_columns = pl.LazyFrame(
+        {
+            "sample": ["a", "b", "c"],
+            "positive_for_HPAI": ["TRUE", "TRUE", "TRUE"],
+            "SRA_accession": ["SRR29324548", "SRR31094751", "SRR00000001"],
+            "SRA_bioproject": ["PRJNA1121320", "PRJNA1121320", "PRJNA1121320"],
+        }
+    )
+    resolved = {
+        "SRR29324548": "PRJNA1121320",
+        "SRR31094751": "PRJNA9999999",
+        "SRR00000001": None,
+    }
+
+    issues = check_project_mapping(sra_columns, resolved).collect().sort("sample")
+    assert issues.select("sample", "issue").rows() == [
+        ("b", "SRA accession belongs to PRJNA9999999"),
+        ("c", "SRA accession not found"),
+    ]
+
+
+def test_fixture_run_exits_on_mismatch_without_default_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    detections = write_detections(
+        tmp_path / "detections.tsv",
+        [
+            ("dholab_1_01", "SRR29324548", "PRJNA1121320"),
+            ("dholab_1_02", "SRR31094751", "PRJNA1121320"),
+        ],
+    )
+
+    report = tmp_path / "report.tsv"
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-b", "fixture", "--fixture", str(FIXTURE), "-o", str(report), str(detections)])
+    assert exit_info.value.code == 1
+    issues = pl.read_csv(report, separator="\t")
+    assert issues.select("sample", "issue").rows() == [
+        ("dholab_1_02", "SRA accession belongs to PRJNA9999999"),
+    ]
+    assert not (tmp_path / ".pipeline_cache").exists()
+
+
+def test_concurrent_runs_keep_each_others_entries(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    backend = FixtureBackend(FIXTURE)
+    # both runs load the cache before either has written to it
+    first = AccessionCache(cache_path, backend.identity, MAX_AGE)
+    second = AccessionCache(cache_path, backend.identity, MAX_AGE)
+
+    first.update({"SRR29324548": "PRJNA1121320"})
+    second.update({"SRR29324549": "PRJNA1121320"})
+
+    known, stale = AccessionCache(cache_path, backend.identity, MAX_AGE).lookup(
+        ["SRR29324548", "SRR29324549"]
+    )
+    assert stale == []
+    assert known == {"SRR29324548": "PRJNA1121320", "SRR29324549": "PRJNA1121320"}
+
+
+def test_positivity_is_compared_case_insensitively(tmp_path):
+    detections = tmp_path / "detections.tsv"
+    detections.write_text(
+        "sample\tpositive_for_HPAI\tSRA_accession\tSRA_bioproject\n"
+        "lower\ttrue\tSRR29324548\tPRJNA1121320\n"
+        "negative\tfalse\tSRR29324549\tPRJNA1121320\n",
+        encoding="utf8",
+    )
+
+    issues = check_row_consistency(parse_sra_columns(str(detections))).collect()
+    assert issues.select("sample", "issue").rows() == [
+        ("negative", "SRA data on a row that is not positive for HPAI"),
+    ]
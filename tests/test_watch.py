@@ -0,0 +1,71 @@
+import os
+import shutil
+import stat
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from scripts import watch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class StopWatching(Exception):
+    pass
+
+
+@pytest.fixture
+def watched(tmp_path):
+    shutil.copy(REPO_ROOT / "DETECTION_RESULTS.tsv", tmp_path / "DETECTION_RESULTS.tsv")
+    shutil.copy(REPO_ROOT / "README.md", tmp_path / "README.md")
+    (tmp_path / "assets").mkdir()
+    return tmp_path
+
+
+def watch_args(root: Path, *extra: str) -> list[str]:
+    return [
+        "--data", str(root / "DETECTION_RESULTS.tsv"),
+        "--assets_dir", str(root / "assets"),
+        "--readme", str(root / "README.md"),
+        "--metrics", str(root / "metrics.json"),
+        *extra,
+    ]
+
+
+def test_republished_files_are_not_private(watched):
+    readme = watched / "README.md"
+    os.chmod(readme, 0o644)
+    old_umask = os.umask(0o022)
+    try:
+        watch.main(watch_args(watched, "--once"))
+    finally:
+        os.umask(old_umask)
+
+    assert "Recent results in the 90 days preceding" in readme.read_text()
+    for path in (readme, watched / "assets" / "positivity_tally.md", watched / "assets" / "recent_tally.tsv"):
+        assert stat.S_IMODE(path.stat().st_mode) == 0o644, path
+
+
+def test_failed_rollover_waits_for_a_change(watched, monkeypatch):
+    watcher = watch.Watcher(watch.parse_command_line_args(watch_args(watched, "--interval", "0")))
+    assert watcher.try_run()
+
+    # the data goes missing just as the date rolls over
+    (watched / "DETECTION_RESULTS.tsv").unlink()
+    watcher.tally_date = date.today() - timedelta(days=1)
+
+    polls = 0
+
+    def sleep(_seconds: float) -> None:
+        nonlocal polls
+        polls += 1
+        if polls > 5:
+            raise StopWatching
+
+    monkeypatch.setattr(watch.time, "sleep", sleep)
+    with pytest.raises(StopWatching):
+        watcher.watch()
+
+    assert watcher.metrics["failed_runs"] == 1
+    assert watcher.metrics["runs"] == 1